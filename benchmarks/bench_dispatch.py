@@ -0,0 +1,215 @@
+"""
+Per-message overhead of the whole on_message chain: bot.dispatch("message")
+through every listener (Moderation's filter / anti-spam and command
+handling) until all of them are done, for a realistic mix of chat, built-in
+commands, custom commands and unknown commands across many guilds.
+Per-guild state built on first use (word filters, anti-spam limiters) is
+warmed up before timing.
+
+  listener  commands.Bot + the old CustomCommands.on_message, which parsed
+            the prefix a second time and read the guild's commands with
+            setdefault (an empty dict for every guild that used the prefix)
+  dispatch  the bot's process_commands (utils.dispatch): one parse, built-in
+            commands first, then the guild's custom commands
+
+Needs the bot's environment (py-cord); no Discord connection is made.
+Run from the repo root:
+    python -m benchmarks.bench_dispatch
+    python -m benchmarks.bench_dispatch --messages 200000 --guilds 5000
+"""
+import argparse
+import asyncio
+import os
+import random
+import tempfile
+import time
+from types import SimpleNamespace
+
+import discord
+from discord.ext import commands
+
+from cogs.custom_commands import NAMESPACE, CustomCommands
+from cogs.moderation import ANTISPAM_NAMESPACE, Moderation
+from utils.dispatch import dispatch
+from utils.storage import Storage
+
+PREFIX = "!"
+# share of guilds with custom commands, and how many they have
+CUSTOM_GUILD_SHARE = 0.2
+COMMANDS_PER_GUILD = 15
+# message mix
+MIX = {"chat": 0.90, "builtin": 0.04, "custom": 0.04, "unknown": 0.02}
+BATCH = 500
+SEED = 25
+
+
+class DispatchBot(commands.Bot):
+    # same as main.TsukiBot (main.py can't be imported without a config.json)
+    async def process_commands(self, message):
+        await dispatch(self, message)
+
+
+class Builtins(commands.Cog):
+    @commands.command(name="ping")
+    async def ping(self, ctx):
+        await ctx.channel.send("pong")
+
+
+class LegacyCustomCommands(commands.Cog):
+    """The listener custom commands used before the shared dispatch."""
+
+    def __init__(self, data: dict):
+        self.data = data
+
+    def get_guild_cmds(self, guild_id: int):
+        return self.data.setdefault(str(guild_id), {})
+
+    @commands.Cog.listener()
+    async def on_message(self, message):
+        if message.author.bot or not message.guild:
+            return
+        content = message.content
+        if not content.startswith(PREFIX):
+            return
+        cmd_name = content[len(PREFIX) :].split(" ", 1)[0].lower()
+        cmds = self.get_guild_cmds(message.guild.id)
+        if cmd_name in cmds:
+            resp = cmds[cmd_name].replace("{user}", message.author.mention)
+            await message.channel.send(resp)
+
+
+class FakeChannel:
+    def __init__(self, channel_id: int):
+        self.id = channel_id
+        self.mention = f"<#{channel_id}>"
+        self.sent = 0
+
+    async def send(self, *args, **kwargs):
+        self.sent += 1
+
+
+def make_message(rng: random.Random, guilds: list, custom: dict[int, list[str]], kind: str):
+    guild, channel = rng.choice(guilds)
+    if kind == "custom":
+        while guild.id not in custom:
+            guild, channel = rng.choice(guilds)
+        content = f"{PREFIX}{rng.choice(custom[guild.id])} some args"
+    elif kind == "builtin":
+        content = f"{PREFIX}ping"
+    elif kind == "unknown":
+        content = f"{PREFIX}nosuchcommand{rng.randrange(50)}"
+    else:
+        content = "just talking about things " * rng.randint(1, 4)
+    user_id = rng.randrange(1, 1_000_000)
+    author = SimpleNamespace(id=user_id, bot=False, mention=f"<@{user_id}>")
+    return SimpleNamespace(
+        id=rng.getrandbits(60), content=content, author=author, guild=guild,
+        channel=channel, _state=None,
+    )
+
+
+def make_data(rng: random.Random, n_guilds: int):
+    guilds = []
+    data: dict[str, dict[str, str]] = {}
+    custom: dict[int, list[str]] = {}
+    for gid in range(1, n_guilds + 1):
+        guilds.append((SimpleNamespace(id=gid, name=f"guild {gid}"), FakeChannel(gid)))
+        if rng.random() < CUSTOM_GUILD_SHARE:
+            names = [f"cmd{i}" for i in range(COMMANDS_PER_GUILD)]
+            data[str(gid)] = {name: f"hello {{user}}, this is {name}" for name in names}
+            custom[gid] = names
+    return guilds, data, custom
+
+
+async def run(mode: str, args, messages: list, data: dict) -> dict:
+    intents = discord.Intents.default()
+    intents.message_content = True
+    cls = DispatchBot if mode == "dispatch" else commands.Bot
+    bot = cls(command_prefix=PREFIX, intents=intents, help_command=None)
+    # no gateway: get_context compares the author with the bot user
+    bot._connection.user = SimpleNamespace(id=0)
+
+    @bot.event
+    async def on_command_error(ctx, error):
+        pass
+
+    with tempfile.TemporaryDirectory() as tmp:
+        bot.storage = Storage(os.path.join(tmp, "bench.db"))
+        for gid_str, cmds in data.items():
+            for name, resp in cmds.items():
+                await bot.storage.set(NAMESPACE, int(gid_str), name, resp)
+        for gid in range(1, args.guilds + 1):
+            # high enough that nobody gets timed out mid-run
+            await bot.storage.set(ANTISPAM_NAMESPACE, gid, "messages", 10**9)
+
+        moderation = Moderation(bot)
+        bot.add_cog(moderation)
+        bot.add_cog(Builtins())
+        # compile every guild's word filter up front, only dispatch is timed
+        for gid in range(1, args.guilds + 1):
+            moderation.get_word_filter(gid)
+            moderation.get_spam_limiter(gid)
+        if mode == "dispatch":
+            bot.add_cog(CustomCommands(bot))
+            entries = lambda: len(bot.command_index.guilds)  # noqa: E731
+        else:
+            legacy = LegacyCustomCommands({k: dict(v) for k, v in data.items()})
+            bot.add_cog(legacy)
+            entries = lambda: len(legacy.data)  # noqa: E731
+
+        current = asyncio.current_task()
+        guild_entries = entries()
+
+        async def drain():
+            while any(t is not current and not t.done() for t in asyncio.all_tasks()):
+                await asyncio.sleep(0)
+
+        start = time.perf_counter()
+        for i in range(0, len(messages), BATCH):
+            for message in messages[i : i + BATCH]:
+                bot.dispatch("message", message)
+            await drain()
+        elapsed = time.perf_counter() - start
+        # taken before unloading: CustomCommands clears the index in cog_unload
+        new_guild_entries = entries() - guild_entries
+
+        moderation.cog_unload()
+        if mode == "dispatch":
+            bot.get_cog("CustomCommands").cog_unload()
+        return {
+            "us_per_message": elapsed / len(messages) * 1e6,
+            "new_guild_entries": new_guild_entries,
+        }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--messages", type=int, default=100_000)
+    parser.add_argument("--guilds", type=int, default=2_000)
+    args = parser.parse_args()
+
+    rng = random.Random(SEED)
+    guilds, data, custom = make_data(rng, args.guilds)
+    kinds = rng.choices(list(MIX), weights=list(MIX.values()), k=args.messages)
+    mixed = [make_message(rng, guilds, custom, kind) for kind in kinds]
+    per_kind = {
+        kind: [make_message(rng, guilds, custom, kind) for _ in range(args.messages // 10)]
+        for kind in MIX
+    }
+
+    print(
+        f"{args.messages:,} messages over {args.guilds:,} guilds "
+        f"({len(custom):,} with custom commands), mix "
+        + ", ".join(f"{k} {v:.0%}" for k, v in MIX.items())
+    )
+    for mode in ("listener", "dispatch"):
+        r = asyncio.run(run(mode, args, mixed, data))
+        line = f"{mode:<9} mix {r['us_per_message']:7.1f} µs/msg"
+        for kind, messages in per_kind.items():
+            k = asyncio.run(run(mode, args, messages, data))
+            line += f" | {kind} {k['us_per_message']:6.1f}"
+        print(f"{line} | guild entries created on read: {r['new_guild_entries']:,}")
+
+
+if __name__ == "__main__":
+    main()
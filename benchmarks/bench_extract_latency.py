@@ -0,0 +1,119 @@
+"""
+Event loop latency while yt-dlp-like searches run on the extraction service,
+thread workers vs process workers.
+
+The "search" is a CPU-bound stub (JSON and regex munging, roughly what
+yt-dlp does with a player response) so no network or yt-dlp install is
+needed. A ticker task measures how late the event loop wakes up, which is
+what the gateway heartbeat and every command feel.
+
+Run from the repo root:
+    python -m benchmarks.bench_extract_latency
+"""
+import asyncio
+import json
+import multiprocessing
+import re
+import statistics
+import time
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+
+from utils.extraction import ExtractionService
+
+WORKERS = 4
+CONCURRENCY = (1, 8, 32)
+TICK = 0.005
+# roughly one player response worth of JSON
+PAYLOAD = json.dumps(
+    {
+        "formats": [
+            {"format_id": str(i), "url": "https://example.invalid/" + "x" * 200, "abr": i}
+            for i in range(400)
+        ],
+        "title": "stub",
+    }
+)
+
+# warm per-worker state, like the YoutubeDL instances in utils.ytworker
+_state = {}
+
+
+def init_stub():
+    _state["pattern"] = re.compile(r'"abr": (\d+)')
+
+
+def fake_extract(query: str) -> dict:
+    pattern = _state["pattern"]
+    best = 0
+    for _ in range(60):
+        data = json.loads(PAYLOAD)
+        best = max(best, max(int(m) for m in pattern.findall(json.dumps(data))))
+    return {"query": query, "best": best}
+
+
+async def measure(service: ExtractionService, concurrency: int) -> dict:
+    lags: list[float] = []
+    done = asyncio.Event()
+
+    async def ticker():
+        while not done.is_set():
+            start = time.perf_counter()
+            await asyncio.sleep(TICK)
+            lags.append((time.perf_counter() - start - TICK) * 1000)
+
+    tick_task = asyncio.create_task(ticker())
+    start = time.perf_counter()
+    # spread over guilds like real traffic
+    await asyncio.gather(
+        *(service.extract(i % 8, f"song {i}") for i in range(concurrency))
+    )
+    elapsed = time.perf_counter() - start
+    done.set()
+    await tick_task
+
+    lags.sort()
+    return {
+        "elapsed": elapsed,
+        "lag_avg": statistics.mean(lags),
+        "lag_p99": lags[int(len(lags) * 0.99)],
+        "lag_max": lags[-1],
+    }
+
+
+async def run_mode(name: str, executor) -> None:
+    service = ExtractionService(
+        fake_extract, workers=WORKERS, max_queue=1000, max_per_guild=1000, executor=executor
+    )
+    # start every worker before measuring, like a long-running bot would have
+    await asyncio.gather(*(service.extract(i, "warmup") for i in range(WORKERS * 2)))
+
+    for concurrency in CONCURRENCY:
+        r = await measure(service, concurrency)
+        print(
+            f"{name:<9} {concurrency:>3} searches: {r['elapsed'] * 1000:7.0f} ms total | "
+            f"loop lag avg {r['lag_avg']:6.2f} ms, p99 {r['lag_p99']:6.2f} ms, "
+            f"max {r['lag_max']:6.2f} ms"
+        )
+    service.close()
+
+
+def main():
+    print(f"{WORKERS} workers, one stub search = ", end="")
+    init_stub()
+    start = time.perf_counter()
+    fake_extract("x")
+    print(f"{(time.perf_counter() - start) * 1000:.0f} ms of CPU")
+
+    threads = ThreadPoolExecutor(max_workers=WORKERS, initializer=init_stub)
+    asyncio.run(run_mode("threads", threads))
+
+    processes = ProcessPoolExecutor(
+        max_workers=WORKERS,
+        mp_context=multiprocessing.get_context("spawn"),
+        initializer=init_stub,
+    )
+    asyncio.run(run_mode("processes", processes))
+
+
+if __name__ == "__main__":
+    main()
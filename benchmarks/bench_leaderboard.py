@@ -0,0 +1,79 @@
+"""
+Invite leaderboard with 1M join/leave events: the incrementally sorted
+Leaderboard vs a plain dict that is sorted on every `!invites top`.
+
+Run from the repo root:
+    python -m benchmarks.bench_leaderboard
+"""
+import heapq
+import random
+import statistics
+import time
+
+from utils.leaderboard import Leaderboard
+
+EVENTS = 1_000_000
+INVITERS = 50_000
+LEAVE_RATE = 0.2
+# one `!invites top` per this many events
+QUERY_EVERY = 1_000
+TOP_N = 10
+SEED = 9
+
+
+def make_events(rng: random.Random) -> list[tuple[int, int]]:
+    # a few inviters bring most of the members
+    weights = [1 / (i + 1) for i in range(INVITERS)]
+    inviters = rng.choices(range(INVITERS), weights=weights, k=EVENTS)
+    return [(user_id, -1 if rng.random() < LEAVE_RATE else 1) for user_id in inviters]
+
+
+def run_leaderboard(events) -> tuple[float, list[float], list]:
+    board = Leaderboard()
+    queries = []
+    start = time.perf_counter()
+    for i, (user_id, delta) in enumerate(events, start=1):
+        board.add(user_id, delta)
+        if i % QUERY_EVERY == 0:
+            q = time.perf_counter()
+            top = board.top(TOP_N)
+            queries.append(time.perf_counter() - q)
+    return time.perf_counter() - start, queries, top
+
+
+def run_sort_per_query(events) -> tuple[float, list[float], list]:
+    scores: dict[int, int] = {}
+    queries = []
+    start = time.perf_counter()
+    for i, (user_id, delta) in enumerate(events, start=1):
+        scores[user_id] = scores.get(user_id, 0) + delta
+        if i % QUERY_EVERY == 0:
+            q = time.perf_counter()
+            top = heapq.nsmallest(
+                TOP_N, ((-s, u) for u, s in scores.items() if s)
+            )
+            top = [(u, -neg) for neg, u in top]
+            queries.append(time.perf_counter() - q)
+    return time.perf_counter() - start, queries, top
+
+
+def main():
+    rng = random.Random(SEED)
+    events = make_events(rng)
+    print(f"{EVENTS:,} events over {INVITERS:,} inviters, top {TOP_N} every {QUERY_EVERY:,} events")
+
+    results = {}
+    for name, fn in (("leaderboard", run_leaderboard), ("sort/query", run_sort_per_query)):
+        total, queries, top = fn(events)
+        results[name] = top
+        q_us = sorted(q * 1e6 for q in queries)
+        print(
+            f"{name:<12} total {total:6.2f}s | {total / EVENTS * 1e6:5.2f} µs/event incl. queries | "
+            f"top query avg {statistics.mean(q_us):8.1f} µs, p99 {q_us[int(len(q_us) * 0.99)]:8.1f} µs"
+        )
+
+    assert results["leaderboard"] == results["sort/query"], "leaderboards disagree"
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,113 @@
+"""
+Raid simulation against a fake HTTP client that records every REST call:
+per-message actions (old on_message behaviour) vs ModerationQueue.
+
+Run from the repo root:
+    python -m benchmarks.bench_modqueue
+"""
+import asyncio
+import random
+from collections import Counter
+
+from utils.modqueue import ModerationQueue
+
+CHANNELS = 3
+RAIDERS = 200
+MESSAGES = 2_000
+# the raid is spread over this many seconds
+DURATION = 5.0
+SEED = 3
+
+
+class FakeHTTP:
+    """Records calls as (route, batch size) with a small fixed latency."""
+
+    def __init__(self, latency: float = 0.005):
+        self.latency = latency
+        self.calls: list[tuple[str, int]] = []
+
+    async def request(self, route: str, size: int = 1):
+        self.calls.append((route, size))
+        await asyncio.sleep(self.latency)
+
+
+class FakeChannel:
+    def __init__(self, http: FakeHTTP, id: int):
+        self.http = http
+        self.id = id
+
+    async def send(self, content: str, delete_after: float | None = None):
+        await self.http.request("send message")
+
+    async def delete_messages(self, messages: list):
+        await self.http.request("bulk delete", len(messages))
+
+
+class FakeMember:
+    def __init__(self, http: FakeHTTP, id: int):
+        self.http = http
+        self.id = id
+        self.mention = f"<@{id}>"
+
+    async def edit(self, **kwargs):
+        await self.http.request("edit member")
+
+
+class FakeMessage:
+    def __init__(self, http: FakeHTTP, id: int, channel: FakeChannel, author: FakeMember):
+        self.http = http
+        self.id = id
+        self.channel = channel
+        self.author = author
+
+    async def delete(self):
+        await self.http.request("delete message")
+
+
+def make_raid(http: FakeHTTP) -> list[FakeMessage]:
+    rng = random.Random(SEED)
+    channels = [FakeChannel(http, i) for i in range(CHANNELS)]
+    members = [FakeMember(http, i) for i in range(RAIDERS)]
+    return [
+        FakeMessage(http, i, rng.choice(channels), rng.choice(members))
+        for i in range(MESSAGES)
+    ]
+
+
+async def per_message():
+    http = FakeHTTP()
+    for msg in make_raid(http):
+        # old flow: delete, warn, and (for spam) timeout, each awaited separately
+        await msg.delete()
+        await msg.channel.send(f"{msg.author.mention}, watch your language.", delete_after=8)
+        await msg.author.edit(timed_out_until=None, reason="Spam (auto)")
+    return http
+
+
+async def queued():
+    http = FakeHTTP()
+    queue = ModerationQueue(window=0.5, workers=2)
+    raid = make_raid(http)
+    gap = DURATION / len(raid)
+    for msg in raid:
+        queue.delete(msg)
+        queue.warn(msg.channel, msg.author.mention, "watch your language.")
+        queue.timeout(msg.author, None, "Spam (auto)")
+        await asyncio.sleep(gap)
+    await queue.flush()
+    return http
+
+
+def report(name: str, http: FakeHTTP):
+    routes = Counter(route for route, _ in http.calls)
+    print(f"{name:>12}: {len(http.calls):>5} REST calls | {dict(routes)}")
+
+
+async def main():
+    print(f"{MESSAGES:,} offending messages from {RAIDERS} raiders in {CHANNELS} channels\n")
+    report("per-message", await per_message())
+    report("queued", await queued())
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -0,0 +1,110 @@
+"""
+Per-message latency of the normalizing word filter on adversarial input
+(leetspeak, homoglyphs, zero-width characters, repeats, zalgo, long runs),
+compared to the old `content.lower()` + substring check.
+
+Run from the repo root:
+    python -m benchmarks.bench_normalize
+"""
+import random
+import string
+import time
+
+from utils.wordfilter import WordFilter
+
+SEED = 99
+MESSAGES = 20_000
+FILLER_WORDS = 1_000
+
+BANNED = ["nigga", "bitch", "nigger", "autistic", "retarded"]
+
+LEET = {"a": "@4", "e": "3", "i": "1!|", "o": "0", "s": "$5", "t": "7"}
+HOMOGLYPH = {"a": "аα", "e": "еε", "i": "іι", "o": "оο", "c": "с", "p": "р", "t": "т"}
+INVISIBLE = ["​", "‌", "‍", "⁠", "﻿", "­"]
+
+
+def disguise(word: str, rng: random.Random) -> str:
+    out = []
+    for ch in word:
+        roll = rng.random()
+        if roll < 0.25 and ch in LEET:
+            ch = rng.choice(LEET[ch])
+        elif roll < 0.45 and ch in HOMOGLYPH:
+            ch = rng.choice(HOMOGLYPH[ch])
+        elif roll < 0.55:
+            ch = ch.upper()
+        elif roll < 0.65:
+            ch = ch * rng.randint(2, 6)
+        elif roll < 0.7:
+            ch = chr(ord("ａ") + ord(ch) - ord("a")) if ch.isalpha() else ch
+        out.append(ch)
+        if rng.random() < 0.3:
+            out.append(rng.choice(INVISIBLE))
+        if rng.random() < 0.1:
+            out.append("̶")  # combining strikethrough
+    return "".join(out)
+
+
+def make_corpus(rng: random.Random) -> tuple[list[str], int]:
+    filler = [
+        "".join(rng.choices(string.ascii_lowercase, k=rng.randint(2, 8)))
+        for _ in range(FILLER_WORDS)
+    ]
+    corpus = []
+    dirty = 0
+    for i in range(MESSAGES):
+        words = rng.choices(filler, k=rng.randint(3, 30))
+        if i % 2 == 0:
+            words.insert(rng.randrange(len(words) + 1), disguise(rng.choice(BANNED), rng))
+            dirty += 1
+        corpus.append(" ".join(words))
+
+    # pathological inputs for backtracking engines
+    corpus.append("n" + "i" * 4000)
+    corpus.append("nig" * 1300)
+    corpus.append("​".join("a" * 2000))
+    return corpus, dirty
+
+
+def percentile(sorted_values: list[float], pct: float) -> float:
+    return sorted_values[min(len(sorted_values) - 1, int(len(sorted_values) * pct))]
+
+
+def run(name: str, fn, corpus: list[str]):
+    timings = []
+    hits = 0
+    for msg in corpus:
+        start = time.perf_counter()
+        found = fn(msg)
+        timings.append(time.perf_counter() - start)
+        if found:
+            hits += 1
+    timings.sort()
+    print(
+        f"{name:>10} | hits {hits:>6} | "
+        f"p50 {percentile(timings, 0.50) * 1e6:7.1f} us | "
+        f"p99 {percentile(timings, 0.99) * 1e6:7.1f} us | "
+        f"max {timings[-1] * 1e6:8.1f} us"
+    )
+
+
+def naive(content: str) -> str | None:
+    content = content.lower()
+    for bad_word in BANNED:
+        if bad_word in content:
+            return bad_word
+    return None
+
+
+def main():
+    rng = random.Random(SEED)
+    corpus, dirty = make_corpus(rng)
+    wf = WordFilter(BANNED)
+
+    print(f"{len(corpus)} messages, {dirty} contain a disguised banned word\n")
+    run("naive", naive, corpus)
+    run("normalized", wf.search, corpus)
+
+
+if __name__ == "__main__":
+    main()
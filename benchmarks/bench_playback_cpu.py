@@ -0,0 +1,120 @@
+"""
+CPU cost per concurrent music stream: the old PCM path vs the Opus paths.
+
+  pcm+volume   FFmpegPCMAudio -> PCMVolumeTransformer -> libopus encode in
+               Python, what every stream used to do (even at 100%)
+  passthrough  FFmpegOpusAudio with codec copy, what YTDLSource does at 100%
+               for Opus inputs (cached files, most YouTube streams)
+  ffmpeg-vol   FFmpegOpusAudio with `-af volume=0.5`, the volume < 100% path
+
+Every stream reads the whole test file as fast as it can, on its own thread
+like discord's per-guild AudioPlayer. CPU time (bot process + ffmpeg
+children) is reported per stream, as a share of one core at real time.
+
+Needs ffmpeg on PATH and py-cord with libopus (the bot's own environment).
+Run from the repo root:
+    python -m benchmarks.bench_playback_cpu
+"""
+import os
+import resource
+import subprocess
+import tempfile
+import threading
+import time
+
+import discord
+
+AUDIO_SECONDS = 60
+CONCURRENCY = (1, 8, 32)
+
+
+def make_input(directory: str) -> str:
+    """A minute of 48 kHz stereo Opus in WebM, like a YouTube audio stream."""
+    path = os.path.join(directory, "input.webm")
+    subprocess.run(
+        [
+            "ffmpeg", "-loglevel", "error", "-y",
+            "-f", "lavfi", "-i", f"sine=frequency=440:duration={AUDIO_SECONDS}",
+            "-ac", "2", "-ar", "48000", "-c:a", "libopus", "-b:a", "128k",
+            path,
+        ],
+        check=True,
+    )
+    return path
+
+
+def play_pcm_volume(path: str):
+    source = discord.PCMVolumeTransformer(discord.FFmpegPCMAudio(path), volume=0.5)
+    encoder = discord.opus.Encoder()
+    while True:
+        data = source.read()
+        if not data:
+            break
+        # what VoiceClient.send_audio_packet(encode=True) does per frame
+        encoder.encode(data, encoder.SAMPLES_PER_FRAME)
+    source.cleanup()
+
+
+def play_passthrough(path: str):
+    source = discord.FFmpegOpusAudio(path, codec="opus")
+    while source.read():
+        pass
+    source.cleanup()
+
+
+def play_ffmpeg_volume(path: str):
+    source = discord.FFmpegOpusAudio(path, options="-af volume=0.5")
+    while source.read():
+        pass
+    source.cleanup()
+
+
+MODES = {
+    "pcm+volume": play_pcm_volume,
+    "passthrough": play_passthrough,
+    "ffmpeg-vol": play_ffmpeg_volume,
+}
+
+
+def cpu_seconds() -> tuple[float, float]:
+    own = resource.getrusage(resource.RUSAGE_SELF)
+    children = resource.getrusage(resource.RUSAGE_CHILDREN)
+    return own.ru_utime + own.ru_stime, children.ru_utime + children.ru_stime
+
+
+def run(play, path: str, streams: int) -> tuple[float, float, float]:
+    own_before, children_before = cpu_seconds()
+    start = time.perf_counter()
+
+    threads = [threading.Thread(target=play, args=(path,)) for _ in range(streams)]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+
+    elapsed = time.perf_counter() - start
+    own_after, children_after = cpu_seconds()
+    return own_after - own_before, children_after - children_before, elapsed
+
+
+def main():
+    if not discord.opus.is_loaded():
+        discord.opus._load_default()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        path = make_input(tmp)
+        print(f"{AUDIO_SECONDS}s of Opus per stream, CPU shown as % of one core at real time")
+        for streams in CONCURRENCY:
+            for name, play in MODES.items():
+                own, children, elapsed = run(play, path, streams)
+                audio = AUDIO_SECONDS * streams
+                print(
+                    f"{name:<12} {streams:>3} streams: "
+                    f"python {own / audio * 100:6.2f}% + ffmpeg {children / audio * 100:6.2f}% "
+                    f"= {(own + children) / audio * 100:6.2f}% per stream "
+                    f"({elapsed:.1f}s wall)"
+                )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,96 @@
+"""
+Anti-spam limiter stress test: 100k distinct users sending messages,
+comparing the old dict-of-datetime-lists with SlidingWindowLimiter.
+Each variant runs in its own process and reports RSS as traffic goes by.
+
+Run from the repo root (Linux, reads /proc for RSS):
+    python -m benchmarks.bench_ratelimit
+"""
+import random
+import subprocess
+import sys
+import time
+from datetime import datetime, timedelta
+
+from utils.ratelimit import SlidingWindowLimiter
+
+USERS = 100_000
+MESSAGES = 500_000
+SPAMMERS = 50
+# simulated chat rate: messages per second across the whole guild
+RATE = 2_000
+CHECKPOINTS = 5
+SEED = 7
+
+
+def rss_mb() -> float:
+    try:
+        with open("/proc/self/status", "r", encoding="utf-8") as f:
+            for line in f:
+                if line.startswith("VmRSS:"):
+                    return int(line.split()[1]) / 1024
+    except OSError:
+        pass
+    return float("nan")
+
+
+def make_traffic() -> list[int]:
+    rng = random.Random(SEED)
+    # every user shows up at least once, plus a handful of spammers
+    traffic = list(range(USERS))
+    for _ in range(MESSAGES - USERS):
+        if rng.random() < 0.05:
+            traffic.append(rng.randrange(SPAMMERS))
+        else:
+            traffic.append(rng.randrange(USERS))
+    rng.shuffle(traffic)
+    return traffic
+
+
+class OldLimiter:
+    """The previous Moderation.on_message logic, kept here for comparison."""
+
+    def __init__(self):
+        self.user_message_times: dict[int, list[datetime]] = {}
+        self.start = datetime(2024, 1, 1)
+
+    def __len__(self):
+        return len(self.user_message_times)
+
+    def hit(self, uid: int, now: float) -> bool:
+        now = self.start + timedelta(seconds=now)
+        times = self.user_message_times.get(uid, [])
+        times = [t for t in times if (now - t).total_seconds() <= 8]
+        times.append(now)
+        self.user_message_times[uid] = times
+        return len(times) > 6
+
+
+def run(mode: str):
+    traffic = make_traffic()
+    limiter = OldLimiter() if mode == "old" else SlidingWindowLimiter(6, 8)
+    every = len(traffic) // CHECKPOINTS
+    triggered = 0
+
+    print(f"[{mode}] baseline RSS {rss_mb():.1f} MB")
+    start = time.perf_counter()
+    for i, uid in enumerate(traffic, start=1):
+        if limiter.hit(uid, i / RATE):
+            triggered += 1
+        if i % every == 0:
+            print(f"[{mode}] {i:>8,} msgs | tracked users {len(limiter):>7,} | RSS {rss_mb():6.1f} MB")
+    elapsed = time.perf_counter() - start
+    print(f"[{mode}] {len(traffic) / elapsed:,.0f} msg/s, triggered {triggered:,}\n")
+
+
+def main():
+    if len(sys.argv) > 1:
+        return run(sys.argv[1])
+
+    print(f"{MESSAGES:,} messages from {USERS:,} users at {RATE:,} msg/s\n")
+    for mode in ("old", "new"):
+        subprocess.run([sys.executable, "-m", "benchmarks.bench_ratelimit", mode], check=True)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,81 @@
+"""
+ReminderScheduler with 1M pending reminders: memory, journal size,
+restart (replay) time and firing jitter for the ones that come due.
+
+Run from the repo root (Linux, reads /proc for RSS):
+    python -m benchmarks.bench_reminders
+"""
+import asyncio
+import os
+import random
+import statistics
+import tempfile
+import time
+
+from utils.scheduler import ReminderScheduler
+
+PENDING = 1_000_000
+# reminders that come due during the run, spread over FIRE_SPAN seconds
+FIRING = 2_000
+FIRE_SPAN = 3.0
+SEED = 5
+
+
+def rss_mb() -> float:
+    try:
+        with open("/proc/self/status", "r", encoding="utf-8") as f:
+            for line in f:
+                if line.startswith("VmRSS:"):
+                    return int(line.split()[1]) / 1024
+    except OSError:
+        pass
+    return float("nan")
+
+
+async def main():
+    rng = random.Random(SEED)
+    base = rss_mb()
+    jitter: list[float] = []
+
+    async def fire(reminder: dict):
+        jitter.append(time.time() - reminder["due"])
+
+    with tempfile.TemporaryDirectory() as tmp:
+        path = os.path.join(tmp, "reminders.jsonl")
+        scheduler = ReminderScheduler(path, fire)
+
+        start = time.perf_counter()
+        now = time.time()
+        for i in range(PENDING):
+            # far future: between 1 hour and 30 days
+            scheduler.add(now + rng.uniform(3600, 30 * 86400), i, i, "drink water")
+        added = time.perf_counter() - start
+        print(f"scheduled {PENDING:,} reminders in {added:.1f}s ({PENDING / added:,.0f}/s)")
+        print(f"RSS +{rss_mb() - base:.0f} MB, journal {os.path.getsize(path) / 2**20:.0f} MB")
+
+        # simulate a restart: replay + compact the journal
+        scheduler.close()
+        start = time.perf_counter()
+        scheduler = ReminderScheduler(path, fire)
+        print(f"restart replay of {len(scheduler):,} reminders took {time.perf_counter() - start:.1f}s")
+
+        now = time.time()
+        for i in range(FIRING):
+            scheduler.add(now + 0.5 + rng.uniform(0, FIRE_SPAN), i, i, "stand up")
+
+        runner = asyncio.create_task(scheduler.run())
+        await asyncio.sleep(FIRE_SPAN + 1.0)
+        runner.cancel()
+        scheduler.close()
+
+    jitter.sort()
+    print(f"\nfired {len(jitter):,}/{FIRING:,} reminders with {PENDING:,} still pending")
+    print(
+        f"jitter: mean {statistics.mean(jitter) * 1000:.2f} ms | "
+        f"p99 {jitter[int(len(jitter) * 0.99)] * 1000:.2f} ms | "
+        f"max {jitter[-1] * 1000:.2f} ms"
+    )
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
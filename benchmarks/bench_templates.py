@@ -0,0 +1,91 @@
+"""
+Rendering custom command / welcome responses: the old str.replace chain vs
+templates compiled once with utils.templates.
+
+  old code     what the cogs did before: .replace("{user}", ...) for custom
+               commands, {member} and {server} for the welcome message
+  replace x6   a replace chain covering every placeholder templates support
+  compiled     compile_template() once, render() per message
+
+Run from the repo root:
+    python -m benchmarks.bench_templates
+"""
+import timeit
+
+from utils.templates import compile_template
+
+RESPONSES = {
+    "short": "Hi {user}!",
+    "welcome": "Welcome {member} to **{server}**! Read the rules in #rules and have fun.",
+    "plain": "Server rules: be nice, no spam, no NSFW. " * 4,
+    "fields": "{user} used `{args}` in {channel} on {server} ({count} times so far).",
+    "rich": (
+        "{Hey|Hi|Yo} {user}, you said `{args}` in {channel}. "
+        "This command was used {count} times on {server}. " * 3
+    ),
+}
+
+VALUES = {
+    "user": "<@123456789012345678>",
+    "member": "<@123456789012345678>",
+    "server": "Tsuki Lounge",
+    "channel": "<#234567890123456789>",
+    "args": "some arguments here",
+    "count": "42",
+}
+NUMBER = 200_000
+REPEAT = 10
+
+
+def old_custom(text: str) -> str:
+    return text.replace("{user}", VALUES["user"])
+
+
+def old_welcome(text: str) -> str:
+    return text.replace("{member}", VALUES["member"]).replace("{server}", VALUES["server"])
+
+
+OLD_CODE = {"welcome": old_welcome}
+
+
+def best_ns(fns: dict) -> dict[str, float]:
+    """
+    ns per call of each function, best of REPEAT rounds. The rounds take
+    turns between the functions so a noisy machine skews all of them alike.
+    """
+    number = NUMBER // REPEAT
+    best = dict.fromkeys(fns, float("inf"))
+    for _ in range(REPEAT):
+        for name, fn in fns.items():
+            best[name] = min(best[name], timeit.timeit(fn, number=number) / number * 1e9)
+    return best
+
+
+def replace_all(text: str) -> str:
+    for name, value in VALUES.items():
+        text = text.replace("{" + name + "}", value)
+    return text
+
+
+def main():
+    print(f"{NUMBER:,} renders each, ns per render")
+    for name, text in RESPONSES.items():
+        template = compile_template(text)
+        compile_us = timeit.timeit(lambda: compile_template(text), number=2_000) / 2_000 * 1e6
+        old_code = OLD_CODE.get(name, old_custom)
+        ns = best_ns(
+            {
+                "old": lambda: old_code(text),
+                "chain": lambda: replace_all(text),
+                "compiled": lambda: template.render(VALUES),
+            }
+        )
+        print(
+            f"{name:<8} ({len(text):>3} chars): old code {ns['old']:6.0f} | "
+            f"replace x6 {ns['chain']:6.0f} | compiled {ns['compiled']:6.0f} "
+            f"(compile once: {compile_us:.1f} µs)"
+        )
+
+
+if __name__ == "__main__":
+    main()
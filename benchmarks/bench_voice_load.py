@@ -0,0 +1,340 @@
+"""
+Voice load harness: N GuildMusicPlayer instances playing local Opus files
+(from a throwaway audio cache) into fake voice clients, to find how many
+guilds one process can serve before audio stutters. Use it as the baseline
+for every music change.
+
+Each fake voice client runs its own send thread with the same 20 ms pacing
+as discord's AudioPlayer, encoding with libopus when the source isn't Opus,
+and records how late every frame is sent. Measured per run:
+  - frame send lateness (p50 / p99 / max) and stutters (> 1 frame late)
+  - CPU per stream (bot process + ffmpeg children, % of a core)
+  - event loop lag
+  - RSS of the bot process and of all ffmpeg processes
+  - track transition gaps and player wake-up latency (GuildMusicPlayer.gaps
+    and .wakeups)
+  - with --switch, the worst frame lateness right after each volume switch
+    (the reopened source being swapped in)
+
+Needs the bot's environment (py-cord, yt-dlp, ffmpeg on PATH); no Discord
+connection is made. Run from the repo root:
+    python -m benchmarks.bench_voice_load
+    python -m benchmarks.bench_voice_load --players 1 25 100 --volume 0.5 --json baseline.json
+    python -m benchmarks.bench_voice_load --players 1 10 --switch 0.5 0.8
+"""
+import argparse
+import asyncio
+import json
+import resource
+import statistics
+import subprocess
+import tempfile
+import threading
+import time
+
+import discord
+
+import cogs.music as music
+from cogs.music import GuildMusicPlayer, Track
+from utils.audiocache import AudioCache
+
+FRAME = 0.02
+TRACK_SECONDS = 20
+TRACKS_PER_PLAYER = 2
+# seconds between volume switches with --switch
+SWITCH_EVERY = 4.0
+# frames after a switch that count towards its stall
+SWITCH_FRAMES = 25
+
+
+def rss_mb(pid: int | str = "self") -> float:
+    try:
+        with open(f"/proc/{pid}/status", "r", encoding="utf-8") as f:
+            for line in f:
+                if line.startswith("VmRSS:"):
+                    return int(line.split()[1]) / 1024
+    except OSError:
+        pass
+    return 0.0
+
+
+def make_track_file(cache: AudioCache, index: int) -> str:
+    """Stereo 48 kHz Opus file in the audio cache, the way the bot stores them."""
+    video_id = f"bench{index}"
+    path = cache.path_for(video_id)
+    subprocess.run(
+        [
+            "ffmpeg", "-loglevel", "error", "-y",
+            "-f", "lavfi", "-i", f"sine=frequency={220 * (index + 1)}:duration={TRACK_SECONDS}",
+            "-ac", "2", "-ar", "48000", "-c:a", "libopus", "-b:a", "128k",
+            path,
+        ],
+        check=True,
+    )
+    cache.add(video_id)
+    return video_id
+
+
+class FakeVoiceClient:
+    """
+    Just enough of discord.VoiceClient for GuildMusicPlayer. play() runs a
+    send thread paced like discord's AudioPlayer and records frame lateness.
+    """
+
+    def __init__(self, loop: asyncio.AbstractEventLoop):
+        self.loop = loop
+        self.channel = None
+        self.connected = True
+        self.encoder = discord.opus.Encoder() if discord.opus.is_loaded() else None
+        self.lateness: list[float] = []
+        # index into lateness of every source swap
+        self.swaps: list[int] = []
+        self.ffmpeg_pids: set[int] = set()
+        self._source = None
+        self._thread: threading.Thread | None = None
+        self._end = threading.Event()
+        self._resumed = threading.Event()
+        self._lock = threading.Lock()
+
+    def is_connected(self) -> bool:
+        return self.connected
+
+    def is_playing(self) -> bool:
+        return self._thread is not None and self._thread.is_alive() and self._resumed.is_set()
+
+    def is_paused(self) -> bool:
+        return self._thread is not None and self._thread.is_alive() and not self._resumed.is_set()
+
+    @property
+    def source(self):
+        return self._source
+
+    @source.setter
+    def source(self, value):
+        with self._lock:
+            self._source = value
+            self.swaps.append(len(self.lateness))
+            self._track_process(value)
+
+    def _track_process(self, source):
+        process = getattr(source, "_process", None)
+        if process is not None:
+            self.ffmpeg_pids.add(process.pid)
+
+    def play(self, source, *, after=None):
+        self._source = source
+        self._track_process(source)
+        self._end.clear()
+        self._resumed.set()
+        self._thread = threading.Thread(target=self._run, args=(after,), daemon=True)
+        self._thread.start()
+
+    def _run(self, after):
+        error = None
+        loops = 0
+        start = time.perf_counter()
+        try:
+            while not self._end.is_set():
+                if not self._resumed.is_set():
+                    self._resumed.wait()
+                    loops = 0
+                    start = time.perf_counter()
+                    continue
+
+                with self._lock:
+                    source = self._source
+                data = source.read()
+                if not data:
+                    break
+                if not source.is_opus() and self.encoder:
+                    self.encoder.encode(data, self.encoder.SAMPLES_PER_FRAME)
+
+                loops += 1
+                ideal = start + FRAME * loops
+                now = time.perf_counter()
+                self.lateness.append(max(0.0, now - (ideal - FRAME)))
+                time.sleep(max(0.0, ideal - now))
+        except Exception as e:
+            error = e
+        finally:
+            self._source.cleanup()
+        if after is not None:
+            after(error)
+
+    def pause(self):
+        self._resumed.clear()
+
+    def resume(self):
+        self._resumed.set()
+
+    def stop(self):
+        self._end.set()
+        self._resumed.set()
+
+    async def disconnect(self, *, force: bool = False):
+        self.stop()
+        self.connected = False
+
+
+class FakeGuild:
+    def __init__(self, guild_id: int, voice_client: FakeVoiceClient):
+        self.id = guild_id
+        self.name = f"guild {guild_id}"
+        self.voice_client = voice_client
+
+
+class FakeBot:
+    def __init__(self, loop: asyncio.AbstractEventLoop):
+        self.loop = loop
+
+
+def cpu_seconds() -> float:
+    own = resource.getrusage(resource.RUSAGE_SELF)
+    children = resource.getrusage(resource.RUSAGE_CHILDREN)
+    return own.ru_utime + own.ru_stime + children.ru_utime + children.ru_stime
+
+
+def percentile(values: list[float], p: float) -> float:
+    if not values:
+        return float("nan")
+    values = sorted(values)
+    return values[min(len(values) - 1, int(len(values) * p))]
+
+
+async def switch_volumes(players: list, volumes: list[float]):
+    for volume in volumes:
+        await asyncio.sleep(SWITCH_EVERY)
+        for player in players:
+            player.volume = volume
+        await asyncio.gather(*(player.apply_volume() for player in players))
+
+
+async def run(n_players: int, video_ids: list[str], volume: float, switch: list[float]) -> dict:
+    loop = asyncio.get_running_loop()
+    bot = FakeBot(loop)
+    clients = [FakeVoiceClient(loop) for _ in range(n_players)]
+    players = []
+
+    lags: list[float] = []
+    done = asyncio.Event()
+
+    async def ticker():
+        while not done.is_set():
+            start = time.perf_counter()
+            await asyncio.sleep(0.01)
+            lags.append((time.perf_counter() - start - 0.01) * 1000)
+
+    ffmpeg_rss = 0.0
+    peak_rss = rss_mb()
+
+    async def sample_memory():
+        nonlocal ffmpeg_rss, peak_rss
+        while not done.is_set():
+            await asyncio.sleep(1.0)
+            peak_rss = max(peak_rss, rss_mb())
+            pids = {pid for vc in clients for pid in vc.ffmpeg_pids}
+            ffmpeg_rss = max(ffmpeg_rss, sum(rss_mb(pid) for pid in pids))
+
+    cpu_before = cpu_seconds()
+    started = time.perf_counter()
+    tick_task = loop.create_task(ticker())
+    memory_task = loop.create_task(sample_memory())
+
+    for i, vc in enumerate(clients):
+        player = GuildMusicPlayer(bot, FakeGuild(i, vc))
+        player.volume = volume
+        players.append(player)
+        for n in range(TRACKS_PER_PLAYER):
+            video_id = video_ids[(i + n) % len(video_ids)]
+            track = Track(id=video_id, title=video_id, url=video_id, duration=TRACK_SECONDS)
+            await player.add_to_queue(track, None)
+
+    switch_task = loop.create_task(switch_volumes(players, switch)) if switch else None
+
+    while any(vc.connected for vc in clients):
+        await asyncio.sleep(0.5)
+    if switch_task is not None:
+        switch_task.cancel()
+
+    elapsed = time.perf_counter() - started
+    cpu = cpu_seconds() - cpu_before
+    done.set()
+    await asyncio.gather(tick_task, memory_task)
+
+    lateness = [x * 1000 for vc in clients for x in vc.lateness]
+    gaps = [g * 1000 for p in players for g in p.gaps]
+    wakeups = [w * 1000 for p in players for w in p.wakeups]
+    switch_stalls = [
+        max(vc.lateness[i : i + SWITCH_FRAMES], default=0.0) * 1000
+        for vc in clients
+        for i in vc.swaps
+    ]
+    audio_seconds = n_players * TRACKS_PER_PLAYER * TRACK_SECONDS
+    return {
+        "players": n_players,
+        "volume": volume,
+        "wall_s": round(elapsed, 2),
+        "cpu_per_stream_pct": round(cpu / audio_seconds * 100, 3),
+        "frames": len(lateness),
+        "late_p50_ms": round(percentile(lateness, 0.50), 2),
+        "late_p99_ms": round(percentile(lateness, 0.99), 2),
+        "late_max_ms": round(max(lateness, default=float("nan")), 2),
+        "stutters": sum(1 for x in lateness if x > FRAME * 1000),
+        "loop_lag_p99_ms": round(percentile(lags, 0.99), 2),
+        "loop_lag_max_ms": round(max(lags, default=float("nan")), 2),
+        "rss_mb": round(peak_rss, 1),
+        "ffmpeg_rss_mb": round(ffmpeg_rss, 1),
+        "gap_avg_ms": round(statistics.mean(gaps), 1) if gaps else None,
+        "wakeup_avg_ms": round(statistics.mean(wakeups), 2) if wakeups else None,
+        "switches": len(switch_stalls),
+        "switch_late_max_ms": round(max(switch_stalls), 2) if switch_stalls else None,
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--players", type=int, nargs="+", default=[1, 10, 25, 50, 100])
+    parser.add_argument("--volume", type=float, default=1.0)
+    parser.add_argument(
+        "--switch", type=float, nargs="*", default=[],
+        help=f"volumes to switch to, one every {SWITCH_EVERY:.0f}s",
+    )
+    parser.add_argument("--json", help="also write the results to this file")
+    args = parser.parse_args()
+
+    if not discord.opus.is_loaded():
+        try:
+            discord.opus._load_default()
+        except Exception:
+            pass
+
+    results = []
+    with tempfile.TemporaryDirectory() as tmp:
+        # tracks are played from a throwaway audio cache, so nothing is extracted or downloaded
+        music.audio_cache = AudioCache(tmp, 2**30)
+        video_ids = [make_track_file(music.audio_cache, i) for i in range(4)]
+        for n in args.players:
+            r = asyncio.run(run(n, video_ids, args.volume, args.switch))
+            results.append(r)
+            print(
+                f"{r['players']:>4} players: cpu/stream {r['cpu_per_stream_pct']:6.2f}% | "
+                f"frame late p50 {r['late_p50_ms']:6.2f} p99 {r['late_p99_ms']:6.2f} "
+                f"max {r['late_max_ms']:7.2f} ms, {r['stutters']} stutters / {r['frames']} | "
+                f"loop lag p99 {r['loop_lag_p99_ms']:6.2f} ms | "
+                f"rss {r['rss_mb']:.0f} MB + ffmpeg {r['ffmpeg_rss_mb']:.0f} MB | "
+                f"gap avg {r['gap_avg_ms']} ms (wake-up {r['wakeup_avg_ms']} ms)"
+                + (
+                    f" | {r['switches']} volume switches, late max {r['switch_late_max_ms']} ms"
+                    if args.switch
+                    else ""
+                )
+            )
+
+    if args.json:
+        with open(args.json, "w", encoding="utf-8") as f:
+            json.dump(results, f, indent=2)
+        print("Results written to", args.json)
+
+
+if __name__ == "__main__":
+    main()
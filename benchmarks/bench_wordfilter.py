@@ -0,0 +1,64 @@
+"""
+Word filter throughput: compiled WordFilter vs the old linear `in` scan.
+
+Run from the repo root:
+    python -m benchmarks.bench_wordfilter
+"""
+import random
+import string
+import time
+
+from utils.wordfilter import WordFilter
+
+SIZES = [10, 1_000, 10_000]
+MESSAGES = 5_000
+SEED = 1234
+
+
+def random_word(rng: random.Random, lo: int = 4, hi: int = 10) -> str:
+    return "".join(rng.choices(string.ascii_lowercase, k=rng.randint(lo, hi)))
+
+
+def make_messages(rng: random.Random, n: int) -> list[str]:
+    # mostly "normal" chat lines of 5-25 words
+    return [
+        " ".join(random_word(rng, 2, 8) for _ in range(rng.randint(5, 25)))
+        for _ in range(n)
+    ]
+
+
+def linear_scan(words: list[str], content: str) -> str | None:
+    for bad_word in words:
+        if bad_word and bad_word in content:
+            return bad_word
+    return None
+
+
+def bench(fn, messages: list[str]) -> float:
+    start = time.perf_counter()
+    for m in messages:
+        fn(m)
+    return len(messages) / (time.perf_counter() - start)
+
+
+def main():
+    rng = random.Random(SEED)
+    messages = make_messages(rng, MESSAGES)
+
+    print(f"{'words':>8} | {'compile ms':>10} | {'linear msg/s':>13} | {'compiled msg/s':>14}")
+    print("-" * 55)
+    for size in SIZES:
+        words = list({random_word(rng, 5, 10) for _ in range(size)})
+
+        start = time.perf_counter()
+        wf = WordFilter(words)
+        compile_ms = (time.perf_counter() - start) * 1000
+
+        linear = bench(lambda m: linear_scan(words, m), messages)
+        compiled = bench(wf.search, messages)
+
+        print(f"{size:>8} | {compile_ms:>10.1f} | {linear:>13,.0f} | {compiled:>14,.0f}")
+
+
+if __name__ == "__main__":
+    main()
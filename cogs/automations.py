@@ -1,55 +1,119 @@
-import json
-import os
 import discord
 from discord.ext import commands
-from datetime import datetime, timedelta
 import asyncio
+import time
 
-DATA_PATH = "data/guild_config.json"
+from utils.raid import get_join_tracker
+from utils.scheduler import ReminderScheduler
+from utils.storage import get_storage
+from utils.templates import Template, compile_template
 
-
-def load_data():
-    if not os.path.exists(DATA_PATH):
-        return {}
-    with open(DATA_PATH, "r", encoding="utf-8") as f:
-        return json.load(f)
-
-
-def save_data(data):
-    os.makedirs(os.path.dirname(DATA_PATH), exist_ok=True)
-    with open(DATA_PATH, "w", encoding="utf-8") as f:
-        json.dump(data, f, indent=2)
+NAMESPACE = "guild_config"
+# imported into storage once, then no longer written
+LEGACY_DATA_PATH = "data/guild_config.json"
+REMINDERS_PATH = "data/reminders.jsonl"
 
 
 class Automations(commands.Cog):
     def __init__(self, bot: commands.Bot):
         self.bot = bot
-        self.data = load_data()
+        self.storage = get_storage(bot)
+        self.data = self.storage.load(NAMESPACE, LEGACY_DATA_PATH)
+        # guild_id -> compiled welcome message
+        self.welcome_templates: dict[str, Template] = {
+            guild_id: compile_template(cfg["welcome_message"])
+            for guild_id, cfg in self.data.items()
+            if cfg.get("welcome_message")
+        }
+        self.join_tracker = get_join_tracker(bot)
+        # guild_id -> member IDs waiting for autorole until the raid is over
+        self.pending_autoroles: dict[int, set[int]] = {}
+        self.autorole_tasks: dict[int, asyncio.Task] = {}
+        # pending reminders survive restarts, one task serves all of them
+        self.reminders = ReminderScheduler(REMINDERS_PATH, self.send_reminder)
+        self.reminder_task = self.bot.loop.create_task(self.run_reminders())
+
+    def cog_unload(self):
+        for task in self.autorole_tasks.values():
+            task.cancel()
+        self.reminder_task.cancel()
+        self.reminders.close()
 
     # ------ helpers ------
     def get_guild_cfg(self, guild_id: int):
         return self.data.setdefault(str(guild_id), {})
 
-    def set_guild_cfg(self, guild_id: int, key: str, value):
+    async def set_guild_cfg(self, guild_id: int, key: str, value):
         cfg = self.get_guild_cfg(guild_id)
-        if value is None and key in cfg:
-            del cfg[key]
+        if value is None:
+            if key in cfg:
+                del cfg[key]
+                await self.storage.delete(NAMESPACE, guild_id, key)
         else:
             cfg[key] = value
-        save_data(self.data)
+            await self.storage.set(NAMESPACE, guild_id, key, value)
+
+    def get_welcome_template(self, guild_id: int, text: str) -> Template:
+        template = self.welcome_templates.get(str(guild_id))
+        if template is None or template.source != text:
+            template = self.welcome_templates[str(guild_id)] = compile_template(text)
+        return template
+
+    async def flush_autoroles(self, guild: discord.Guild):
+        """Wait for raid mode to end, then give autorole to the members who are still here."""
+        try:
+            while self.join_tracker.in_raid(guild.id):
+                await asyncio.sleep(self.join_tracker.remaining(guild.id) + 1)
+
+            member_ids = self.pending_autoroles.pop(guild.id, set())
+            role_id = self.get_guild_cfg(guild.id).get("autorole_id")
+            role = guild.get_role(role_id) if role_id else None
+            if role is None:
+                return
+
+            for member_id in member_ids:
+                # raiders that were kicked/banned meanwhile are skipped
+                member = guild.get_member(member_id)
+                if member is None or role in member.roles:
+                    continue
+                try:
+                    await member.add_roles(role, reason="Autorole (deferred after raid)")
+                except discord.Forbidden:
+                    return
+                except discord.HTTPException as e:
+                    print("[Automations] Deferred autorole failed:", e)
+        finally:
+            self.autorole_tasks.pop(guild.id, None)
 
     # ------ events ------
     @commands.Cog.listener()
     async def on_member_join(self, member: discord.Member):
         cfg = self.get_guild_cfg(member.guild.id)
+
+        if self.join_tracker.record(member.guild.id, member.id):
+            # raid mode: no welcome spam, autorole is handed out in one go afterwards
+            if cfg.get("autorole_id"):
+                self.pending_autoroles.setdefault(member.guild.id, set()).add(member.id)
+                if member.guild.id not in self.autorole_tasks:
+                    self.autorole_tasks[member.guild.id] = self.bot.loop.create_task(
+                        self.flush_autoroles(member.guild)
+                    )
+            return
+
         # welcome message
         channel_id = cfg.get("welcome_channel")
         msg_template = cfg.get("welcome_message")
         if channel_id and msg_template:
             channel = member.guild.get_channel(channel_id)
             if channel:
-                txt = msg_template.replace("{member}", member.mention).replace(
-                    "{server}", member.guild.name
+                txt = self.get_welcome_template(member.guild.id, msg_template).render(
+                    {
+                        "member": member.mention,
+                        "user": member.mention,
+                        "server": member.guild.name,
+                        "channel": channel.mention,
+                        "count": str(member.guild.member_count),
+                    }
                 )
                 await channel.send(txt)
 
@@ -81,11 +145,13 @@ class Automations(commands.Cog):
         """Set the channel + welcome message."""
         if message is None:
             message = "Welcome, {member} on {server}!"
-        self.set_guild_cfg(ctx.guild.id, "welcome_channel", channel.id)
-        self.set_guild_cfg(ctx.guild.id, "welcome_message", message)
+        await self.set_guild_cfg(ctx.guild.id, "welcome_channel", channel.id)
+        await self.set_guild_cfg(ctx.guild.id, "welcome_message", message)
+        self.welcome_templates[str(ctx.guild.id)] = compile_template(message)
         await ctx.send(
             f"Welcome message set for {channel.mention}.\n"
-            f"Message: `{message}` (use {member} / {server})"
+            f"Message: `{message}` (use {{member}} / {{server}} / {{channel}} / "
+            f"{{count}} for the member count, {{a|b|c}} picks one at random)"
         )
 
     @auto_group.command(name="autorole")
@@ -93,10 +159,10 @@ class Automations(commands.Cog):
     async def auto_autorole(self, ctx, role: discord.Role = None):
         """Enables or disables autorole."""
         if role is None:
-            self.set_guild_cfg(ctx.guild.id, "autorole_id", None)
+            await self.set_guild_cfg(ctx.guild.id, "autorole_id", None)
             await ctx.send("Autorole disabled.")
         else:
-            self.set_guild_cfg(ctx.guild.id, "autorole_id", role.id)
+            await self.set_guild_cfg(ctx.guild.id, "autorole_id", role.id)
             await ctx.send(f"Autorole is set on role {role.mention}.")
 
     @auto_group.command(name="show")
@@ -118,6 +184,28 @@ class Automations(commands.Cog):
             f"- Autorole: {rl.mention if rl else 'undefined'}"
         )
 
+    async def run_reminders(self):
+        await self.bot.wait_until_ready()
+        await self.reminders.run()
+
+    async def send_reminder(self, reminder: dict):
+        channel = self.bot.get_channel(reminder["channel_id"])
+        if channel is None:
+            try:
+                channel = await self.bot.fetch_channel(reminder["channel_id"])
+            except (discord.NotFound, discord.Forbidden):
+                return
+
+        late = time.time() - reminder["due"]
+        suffix = " (sorry, I was offline)" if late > 60 else ""
+        try:
+            await channel.send(
+                f"⏰ <@{reminder['user_id']}> reminder: {reminder['text']}{suffix}",
+                allowed_mentions=discord.AllowedMentions(users=True),
+            )
+        except discord.Forbidden:
+            pass
+
     # ------ simple remind command ------
     @commands.command(name="remind")
     async def remind(self, ctx, minutes: int, *, text: str):
@@ -130,17 +218,7 @@ class Automations(commands.Cog):
             f"Ok {ctx.author.mention}, i will remind you that after {minutes} minute(s). ⏰"
         )
 
-        async def _task():
-            await asyncio.sleep(minutes * 60)
-            try:
-                await ctx.send(
-                    f"⏰ {ctx.author.mention} reminder: {text}",
-                    allowed_mentions=discord.AllowedMentions(users=True),
-                )
-            except discord.Forbidden:
-                pass
-
-        self.bot.loop.create_task(_task())
+        self.reminders.add(time.time() + minutes * 60, ctx.channel.id, ctx.author.id, text)
 
 
 def setup(bot: commands.Bot):
@@ -1,42 +1,57 @@
-import json
-import os
 from discord.ext import commands
 import discord
 
-DATA_PATH = "data/custom_commands.json"
+from utils.dispatch import get_command_index
+from utils.storage import get_storage
+from utils.templates import Template, compile_template
 
-
-def load_data():
-    if not os.path.exists(DATA_PATH):
-        return {}
-    with open(DATA_PATH, "r", encoding="utf-8") as f:
-        return json.load(f)
-
-
-def save_data(data):
-    os.makedirs(os.path.dirname(DATA_PATH), exist_ok=True)
-    with open(DATA_PATH, "w", encoding="utf-8") as f:
-        json.dump(data, f, indent=2)
+NAMESPACE = "custom_commands"
+# imported into storage once, then no longer written
+LEGACY_DATA_PATH = "data/custom_commands.json"
+# command name -> times used, only kept for responses that show {count}
+USES_NAMESPACE = "custom_command_uses"
+# {args} is whatever the member typed: never let it ping @everyone or a role
+RESPONSE_MENTIONS = discord.AllowedMentions(everyone=False, roles=False)
 
 
 class CustomCommands(commands.Cog):
     def __init__(self, bot: commands.Bot):
         self.bot = bot
-        self.data = load_data()
-
-    def get_guild_cmds(self, guild_id: int):
-        return self.data.setdefault(str(guild_id), {})
-
-    def set_cmd(self, guild_id: int, name: str, response: str):
-        cmds = self.get_guild_cmds(guild_id)
-        cmds[name.lower()] = response
-        save_data(self.data)
-
-    def del_cmd(self, guild_id: int, name: str):
+        self.storage = get_storage(bot)
+        self.data = self.storage.load(NAMESPACE, LEGACY_DATA_PATH)
+        self.uses = self.storage.load(USES_NAMESPACE)
+        # built-in and custom commands are dispatched together (utils/dispatch.py);
+        # the index holds the compiled responses, keyed by int guild ID
+        self.index = get_command_index(bot)
+        self.index.clear()
+        for guild_id, cmds in self.data.items():
+            for name, resp in cmds.items():
+                self.index.add(int(guild_id), name, compile_template(resp))
+        self.index.handler = self.run_custom_command
+
+    def cog_unload(self):
+        self.index.handler = None
+        self.index.clear()
+
+    def get_guild_cmds(self, guild_id: int) -> dict[str, str]:
+        """Read-only view; guilds without commands get no entry."""
+        return self.data.get(str(guild_id), {})
+
+    async def set_cmd(self, guild_id: int, name: str, response: str):
+        self.data.setdefault(str(guild_id), {})[name.lower()] = response
+        self.index.add(guild_id, name.lower(), compile_template(response))
+        await self.storage.set(NAMESPACE, guild_id, name.lower(), response)
+
+    async def del_cmd(self, guild_id: int, name: str):
         cmds = self.get_guild_cmds(guild_id)
         if name.lower() in cmds:
             del cmds[name.lower()]
-            save_data(self.data)
+            if not cmds:
+                del self.data[str(guild_id)]
+            self.index.remove(guild_id, name.lower())
+            await self.storage.delete(NAMESPACE, guild_id, name.lower())
+            if self.uses.get(str(guild_id), {}).pop(name.lower(), None) is not None:
+                await self.storage.delete(USES_NAMESPACE, guild_id, name.lower())
             return True
         return False
 
@@ -47,7 +62,9 @@ class CustomCommands(commands.Cog):
         """Add, show, or delete custom commands"""
         await ctx.send(
             "Subcommands: `cc add`, `cc del`, `cc list`.\n"
-            "Ex: `!cc add hello -Hello world!-` → comanda `!hello`"
+            "Ex: `!cc add hello -Hello world!-` → comanda `!hello`\n"
+            "Placeholders: `{user}`, `{server}`, `{channel}`, `{args}`, `{count}`, "
+            "`{a|b|c}` picks one at random."
         )
 
     @cc_group.command(name="add")
@@ -55,7 +72,10 @@ class CustomCommands(commands.Cog):
     async def cc_add(self, ctx, name: str, *, response: str):
         if name.startswith(self.bot.command_prefix):
             name = name[len(self.bot.command_prefix) :]
-        self.set_cmd(ctx.guild.id, name, response)
+        if name.lower() in self.bot.all_commands:
+            # built-in commands are dispatched first, this one would never run
+            return await ctx.send(f"`{self.bot.command_prefix}{name}` is a built-in command.")
+        await self.set_cmd(ctx.guild.id, name, response)
         await ctx.send(f"Custom command `{self.bot.command_prefix}{name}` added ✅")
 
     @cc_group.command(name="del")
@@ -63,7 +83,7 @@ class CustomCommands(commands.Cog):
     async def cc_del(self, ctx, name: str):
         if name.startswith(self.bot.command_prefix):
             name = name[len(self.bot.command_prefix) :]
-        if self.del_cmd(ctx.guild.id, name):
+        if await self.del_cmd(ctx.guild.id, name):
             await ctx.send(f"Custom command `{name}` was deleted.")
         else:
             await ctx.send("Can't find this command.")
@@ -79,30 +99,30 @@ class CustomCommands(commands.Cog):
         )
         await ctx.send(text)
 
-    # -------- EXECUTION HOOK --------
-    @commands.Cog.listener()
-    async def on_message(self, message: discord.Message):
-        if message.author.bot or not message.guild:
-            return
-
-        prefix = self.bot.command_prefix
-        content = message.content
-        if isinstance(prefix, (list, tuple)):
-            p = next((p for p in prefix if content.startswith(p)), None)
-            if not p:
-                return
-            used_prefix = p
-        else:
-            if not content.startswith(prefix):
-                return
-            used_prefix = prefix
+    # -------- EXECUTION --------
+    async def run_custom_command(self, ctx: commands.Context, template: Template):
+        """Called by the dispatcher with the name and prefix it already parsed."""
+        name = ctx.invoked_with.lower()
+        args = ctx.view.read_rest()
+        await ctx.channel.send(
+            await self.render(template, ctx.message, name, args),
+            allowed_mentions=RESPONSE_MENTIONS,
+        )
 
-        cmd_name = content[len(used_prefix) :].split(" ", 1)[0].lower()
-        cmds = self.get_guild_cmds(message.guild.id)
-        if cmd_name in cmds:
-            resp = cmds[cmd_name].replace("{user}", message.author.mention)
-            await message.channel.send(resp)
-            return
+    async def render(self, template: Template, message: discord.Message, name: str, args: str) -> str:
+        values = {
+            "user": message.author.mention,
+            "member": message.author.mention,
+            "server": message.guild.name,
+            "channel": message.channel.mention,
+            "args": args.strip(),
+        }
+        if "count" in template.fields:
+            guild_uses = self.uses.setdefault(str(message.guild.id), {})
+            guild_uses[name] = guild_uses.get(name, 0) + 1
+            values["count"] = str(guild_uses[name])
+            await self.storage.set(USES_NAMESPACE, message.guild.id, name, guild_uses[name])
+        return template.render(values)
 
 def setup(bot: commands.Bot):
     bot.add_cog(CustomCommands(bot))
@@ -1,42 +1,228 @@
-import json
-import os
+import asyncio
+import time
 import discord
 from discord.ext import commands
 
-DATA_PATH = "data/invites.json"
+from utils.leaderboard import Leaderboard
+from utils.raid import get_join_tracker
+from utils.ratelimit import TokenBucket
+from utils.storage import get_storage
 
+NAMESPACE = "invites"
+# imported into storage once, then no longer written
+LEGACY_DATA_PATH = "data/invites.json"
+# inviter_id -> {"joins": n, "leaves": n}
+STATS_NAMESPACE = "inviter_stats"
+# member_id -> inviter_id, so a leave can be taken off the right inviter
+INVITED_BY_NAMESPACE = "invited_by"
 
-def load_data():
-    if not os.path.exists(DATA_PATH):
-        return {}
-    with open(DATA_PATH, "r", encoding="utf-8") as f:
-        return json.load(f)
+LEADERBOARD_DEFAULT = 10
+LEADERBOARD_MAX = 25
 
+# joins arriving together are attributed from one invites() fetch per window
+JOIN_WINDOW = 1.0
+# during a raid, the window is longer
+RAID_SNAPSHOT_WINDOW = 5.0
+# invite changes are written to storage at most this often
+PERSIST_DELAY = 30.0
+# a used-up invite is matched with joins this long around its deletion
+EXHAUSTED_GRACE = 5.0
 
-def save_data(data):
-    os.makedirs(os.path.dirname(DATA_PATH), exist_ok=True)
-    with open(DATA_PATH, "w", encoding="utf-8") as f:
-        json.dump(data, f, indent=2)
+# startup warmup: guilds fetched at once, and invites() calls per second overall
+WARMUP_CONCURRENCY = 4
+WARMUP_RATE = 10.0
+
+
+def invite_entry(invite: discord.Invite) -> dict:
+    """What we keep per invite code."""
+    return {
+        "uses": invite.uses or 0,
+        "inviter": invite.inviter.id if invite.inviter else None,
+        "max_uses": invite.max_uses or 0,
+    }
 
 
 class InviteTracker(commands.Cog):
     def __init__(self, bot: commands.Bot):
         self.bot = bot
-        self.data = load_data()  # guild_id -> {code: uses}
-        self.inviter_stats = {}  # guild_id -> {user_id: count}
+        self.storage = get_storage(bot)
+        # guild_id -> what's in storage, the last written version of self.data
+        self.persisted = self.storage.load(NAMESPACE, LEGACY_DATA_PATH)
+        # guild_id -> {code: invite_entry()}, kept up to date by the invite events
+        self.data: dict[str, dict[str, dict]] = {}
+        self.dirty: set[str] = set()
+        self.flush_task: asyncio.Task | None = None
+        for guild_id, codes in self.persisted.items():
+            self.data[guild_id] = {}
+            for code, entry in codes.items():
+                if isinstance(entry, int):
+                    # old format: just the uses
+                    entry = {"uses": entry, "inviter": None, "max_uses": 0}
+                    self.dirty.add(guild_id)
+                self.data[guild_id][code] = dict(entry)
+
+        self.inviter_stats = self.storage.load(STATS_NAMESPACE)  # guild_id -> {user_id: stats}
+        self.invited_by = self.storage.load(INVITED_BY_NAMESPACE)  # guild_id -> {member_id: inviter_id}
+        # guild_id -> inviters sorted by net invites, built on first use
+        self.leaderboards: dict[str, Leaderboard] = {}
+        self.join_tracker = get_join_tracker(bot)
+        # guild_id -> members waiting for the next attribution
+        self.pending_joins: dict[int, list[discord.Member]] = {}
+        # guild_id -> invites deleted after running out of uses, since the last attribution
+        self.exhausted: dict[int, list[tuple[float, str, dict]]] = {}
+        self.snapshot_tasks: dict[int, asyncio.Task] = {}
+        self.warmup_task: asyncio.Task | None = None
+
+        if self.dirty:
+            self.schedule_flush()
+
+    def cog_unload(self):
+        for task in self.snapshot_tasks.values():
+            task.cancel()
+        if self.warmup_task:
+            self.warmup_task.cancel()
+        if self.flush_task:
+            self.flush_task.cancel()
+        if self.dirty:
+            self.bot.loop.create_task(self.flush())
+
+    # ------ inviter stats ------
+
+    def get_leaderboard(self, guild_id: int | str) -> Leaderboard:
+        guild_id = str(guild_id)
+        board = self.leaderboards.get(guild_id)
+        if board is None:
+            scores = {
+                int(user_id): stats["joins"] - stats["leaves"]
+                for user_id, stats in self.inviter_stats.get(guild_id, {}).items()
+            }
+            board = self.leaderboards[guild_id] = Leaderboard(scores)
+        return board
+
+    def get_inviter_stats(self, guild_id: int | str, inviter_id: int | str) -> dict:
+        return self.inviter_stats.get(str(guild_id), {}).get(
+            str(inviter_id), {"joins": 0, "leaves": 0}
+        )
+
+    async def update_inviter(self, guild: discord.Guild, inviter_id: int, joins: int = 0, leaves: int = 0):
+        # built from the stats before this change, so add() applies it exactly once
+        board = self.get_leaderboard(guild.id)
+        guild_stats = self.inviter_stats.setdefault(str(guild.id), {})
+        stats = guild_stats.setdefault(str(inviter_id), {"joins": 0, "leaves": 0})
+        stats["joins"] += joins
+        stats["leaves"] += leaves
+        board.add(int(inviter_id), joins - leaves)
+        await self.storage.set(STATS_NAMESPACE, guild.id, str(inviter_id), stats)
+
+    async def add_inviter_uses(
+        self,
+        guild: discord.Guild,
+        inviter_id: int,
+        count: int = 1,
+        members: list[discord.Member] = (),
+    ):
+        """Count joins for an inviter, remembering who invited `members` when we know."""
+        await self.update_inviter(guild, inviter_id, joins=count)
+        if not members:
+            return
+        new = {str(member.id): inviter_id for member in members}
+        self.invited_by.setdefault(str(guild.id), {}).update(new)
+        await self.storage.set_many(INVITED_BY_NAMESPACE, guild.id, new)
+
+    def get_log_channel(self, guild: discord.Guild):
+        return guild.system_channel or next(
+            (c for c in guild.text_channels if c.permissions_for(guild.me).send_messages),
+            None,
+        )
+
+    # ------ invite state ------
+
+    def schedule_flush(self):
+        if self.flush_task is None:
+            self.flush_task = self.bot.loop.create_task(self.flush_later())
+
+    async def flush_later(self):
+        try:
+            await asyncio.sleep(PERSIST_DELAY)
+        finally:
+            self.flush_task = None
+        await self.flush()
+
+    async def flush(self):
+        """Write the invites of every changed guild, only the codes that changed."""
+        dirty, self.dirty = self.dirty, set()
+        for guild_id in dirty:
+            new = {code: dict(entry) for code, entry in self.data.get(guild_id, {}).items()}
+            try:
+                await self.storage.sync_guild(
+                    NAMESPACE, guild_id, self.persisted.get(guild_id, {}), new
+                )
+            except Exception as e:
+                print("[Invites] Failed to save invites:", e)
+                self.dirty.add(guild_id)
+                continue
+            self.persisted[guild_id] = new
+        if self.dirty:
+            self.schedule_flush()
+
+    def mark_dirty(self, guild_id: int | str):
+        self.dirty.add(str(guild_id))
+        self.schedule_flush()
+
+    def store_invites(self, guild: discord.Guild, invites: list[discord.Invite], *, flush: bool = True):
+        """Replace the invite state of a guild with a fresh fetch."""
+        self.data[str(guild.id)] = {inv.code: invite_entry(inv) for inv in invites}
+        if flush:
+            self.mark_dirty(guild.id)
+        else:
+            # written by whoever calls flush() next
+            self.dirty.add(str(guild.id))
 
     async def cache_guild_invites(self, guild: discord.Guild):
         invites = await guild.invites()
-        self.data[str(guild.id)] = {inv.code: inv.uses or 0 for inv in invites}
-        save_data(self.data)
+        self.store_invites(guild, invites)
+
+    async def warm_up(self):
+        """
+        Refresh the invites of every guild after (re)connecting, a few guilds
+        at a time and rate-limited, then write everything in one flush.
+        Until a guild is refreshed, attribution uses the state from storage.
+        """
+        started = time.perf_counter()
+        semaphore = asyncio.Semaphore(WARMUP_CONCURRENCY)
+        bucket = TokenBucket(WARMUP_RATE)
+
+        async def warm(guild: discord.Guild) -> bool:
+            async with semaphore:
+                # a pending attribution will fetch this guild anyway
+                if guild.id in self.snapshot_tasks:
+                    return False
+                await bucket.acquire()
+                try:
+                    invites = await guild.invites()
+                except discord.HTTPException:
+                    return False
+                # a join came in meanwhile: its attribution needs the uses from before it
+                if guild.id in self.snapshot_tasks:
+                    return False
+                self.store_invites(guild, invites, flush=False)
+                return True
+
+        try:
+            results = await asyncio.gather(*(warm(g) for g in self.bot.guilds))
+        finally:
+            self.warmup_task = None
+            await self.flush()
+        print(
+            f"[Invites] Cached invites of {sum(results)}/{len(results)} guilds "
+            f"in {time.perf_counter() - started:.1f}s"
+        )
 
     @commands.Cog.listener()
     async def on_ready(self):
-        for guild in self.bot.guilds:
-            try:
-                await self.cache_guild_invites(guild)
-            except discord.Forbidden:
-                pass
+        # on_ready fires again after reconnects, don't run two warmups at once
+        if self.warmup_task is None:
+            self.warmup_task = self.bot.loop.create_task(self.warm_up())
 
     @commands.Cog.listener()
     async def on_guild_join(self, guild: discord.Guild):
@@ -46,47 +232,188 @@ class InviteTracker(commands.Cog):
             pass
 
     @commands.Cog.listener()
-    async def on_member_join(self, member: discord.Member):
-        guild = member.guild
+    async def on_invite_create(self, invite: discord.Invite):
+        if invite.guild is None:
+            return
+        self.data.setdefault(str(invite.guild.id), {})[invite.code] = invite_entry(invite)
+        self.mark_dirty(invite.guild.id)
+
+    @commands.Cog.listener()
+    async def on_invite_delete(self, invite: discord.Invite):
+        if invite.guild is None:
+            return
+        entry = self.data.get(str(invite.guild.id), {}).pop(invite.code, None)
+        if entry is None:
+            return
+        self.mark_dirty(invite.guild.id)
+
+        # a limited invite disappearing right after its last use may have run
+        # out, or been revoked: only a hint, checked against the next fetch
+        if entry["max_uses"] and entry["uses"] >= entry["max_uses"] - 1:
+            self.exhausted.setdefault(invite.guild.id, []).append(
+                (time.monotonic(), invite.code, entry)
+            )
+
+    # ------ attribution ------
+
+    def take_exhausted(self, guild: discord.Guild, window: float) -> dict[str, dict]:
+        """Invites that ran out during (or just before) the last window."""
+        now = time.monotonic()
+        return {
+            code: entry
+            for deleted_at, code, entry in self.exhausted.pop(guild.id, [])
+            if now - deleted_at <= window + EXHAUSTED_GRACE
+        }
+
+    async def fetch_uses(
+        self, guild: discord.Guild, joined: int, exhausted: dict[str, dict]
+    ) -> dict[str, int] | None:
+        """
+        {code: new uses} from a full invites() fetch, which also refreshes our state.
+        Invites that ran out are gone from the fetch, so they're credited one
+        use each only when they match the joins the fetch leaves unexplained
+        exactly. Otherwise those joins stay unattributed: members also join
+        through vanity URLs, Server Discovery or OAuth without any invite,
+        and a limited invite can just as well be revoked.
+        """
         before = self.data.get(str(guild.id), {})
         try:
             invites = await guild.invites()
         except discord.Forbidden:
-            return
+            return None
 
-        used_invite = None
+        uses = {}
         for inv in invites:
-            old_uses = before.get(inv.code, 0)
-            if (inv.uses or 0) > old_uses:
-                used_invite = inv
-                break
-
-        # update cache
-        self.data[str(guild.id)] = {inv.code: inv.uses or 0 for inv in invites}
-        save_data(self.data)
-
-        if used_invite and used_invite.inviter:
-            inviter = used_invite.inviter
-            guild_stats = self.inviter_stats.setdefault(str(guild.id), {})
-            guild_stats[str(inviter.id)] = guild_stats.get(str(inviter.id), 0) + 1
-
-            channel = guild.system_channel or next(
-                (c for c in guild.text_channels if c.permissions_for(guild.me).send_messages),
-                None,
+            old = before.get(inv.code)
+            delta = (inv.uses or 0) - (old["uses"] if old else 0)
+            if delta > 0:
+                uses[inv.code] = delta
+        if exhausted and joined - sum(uses.values()) == len(exhausted):
+            for code, entry in exhausted.items():
+                entry["uses"] += 1
+                uses[code] = 1
+
+        self.store_invites(guild, invites)
+        return uses
+
+    async def attribute_joins(self, guild: discord.Guild, window: float, raid: bool):
+        """
+        Attribute every join of the window at once, from a single invites() fetch.
+        """
+        try:
+            await asyncio.sleep(window)
+            members = self.pending_joins.pop(guild.id, [])
+            if not members:
+                return
+
+            exhausted = self.take_exhausted(guild, window)
+            uses = await self.fetch_uses(guild, len(members), exhausted)
+            if uses is None:
+                return
+            # used-up invites are no longer in the fetch
+            inviters = {code: entry["inviter"] for code, entry in exhausted.items()}
+            for code, entry in self.data.get(str(guild.id), {}).items():
+                inviters[code] = entry["inviter"]
+
+            # when every member of the window came through the same invite,
+            # we know who invited each of them
+            single = None
+            if len(uses) == 1:
+                code, count = next(iter(uses.items()))
+                if count == len(members) and inviters.get(code):
+                    single = code
+
+            for code, count in uses.items():
+                if inviters.get(code):
+                    await self.add_inviter_uses(
+                        guild, inviters[code], count, members if code == single else ()
+                    )
+
+            channel = self.get_log_channel(guild)
+            if channel is None:
+                return
+
+            if not raid and single:
+                entry = self.data.get(str(guild.id), {}).get(single) or exhausted.get(single)
+                for member in members:
+                    await channel.send(
+                        f"{member.mention} was invited from <@{inviters[single]}> "
+                        f"(code `{single}`, total uses: {entry['uses']})."
+                    )
+                return
+
+            # we can't tell which member used which code, only how many uses each code got
+            lines = [
+                f"- `{code}` by <@{inviters[code]}>: +{count}"
+                for code, count in uses.items()
+                if inviters.get(code)
+            ]
+            if raid:
+                text = f"🚨 {len(members)} member(s) joined during a raid."
+            elif lines:
+                text = f"{len(members)} member(s) joined: " + ", ".join(m.mention for m in members)
+            else:
+                return
+            if lines:
+                text += "\n" + "\n".join(lines[:20])
+            await channel.send(text, allowed_mentions=discord.AllowedMentions.none())
+        finally:
+            self.snapshot_tasks.pop(guild.id, None)
+
+    @commands.Cog.listener()
+    async def on_member_join(self, member: discord.Member):
+        guild = member.guild
+        raid = self.join_tracker.record(guild.id, member.id)
+
+        self.pending_joins.setdefault(guild.id, []).append(member)
+        if guild.id not in self.snapshot_tasks:
+            window = RAID_SNAPSHOT_WINDOW if raid else JOIN_WINDOW
+            self.snapshot_tasks[guild.id] = self.bot.loop.create_task(
+                self.attribute_joins(guild, window, raid)
             )
-            if channel:
-                await channel.send(
-                    f"{member.mention} was invited from {inviter.mention} "
-                    f"(code `{used_invite.code}`, total uses: {used_invite.uses})."
-                )
 
-    @commands.command(name="invites")
+    @commands.Cog.listener()
+    async def on_member_remove(self, member: discord.Member):
+        guild = member.guild
+        inviter_id = self.invited_by.get(str(guild.id), {}).pop(str(member.id), None)
+        if inviter_id is None:
+            return
+        await self.storage.delete(INVITED_BY_NAMESPACE, guild.id, str(member.id))
+        await self.update_inviter(guild, inviter_id, leaves=1)
+
+    @commands.group(name="invites", invoke_without_command=True)
     async def invites(self, ctx, member: discord.Member = None):
         """Shows how many invites a member has."""
         member = member or ctx.author
-        guild_stats = self.inviter_stats.get(str(ctx.guild.id), {})
-        count = guild_stats.get(str(member.id), 0)
-        await ctx.send(f"{member.mention} has **{count}** invites.")
+        stats = self.get_inviter_stats(ctx.guild.id, member.id)
+        net = stats["joins"] - stats["leaves"]
+        rank = self.get_leaderboard(ctx.guild.id).rank(member.id)
+
+        text = f"{member.mention} has **{net}** invites ({stats['joins']} joined, {stats['leaves']} left)"
+        if rank:
+            text += f", rank **#{rank}**"
+        await ctx.send(text + ".", allowed_mentions=discord.AllowedMentions.none())
+
+    @invites.command(name="top")
+    async def invites_top(self, ctx, n: int = LEADERBOARD_DEFAULT):
+        """Shows the members with the most invites (joins minus leaves)."""
+        n = max(1, min(n, LEADERBOARD_MAX))
+        top = self.get_leaderboard(ctx.guild.id).top(n)
+        if not top:
+            return await ctx.send("No invites tracked yet.")
+
+        lines = []
+        for position, (user_id, net) in enumerate(top, start=1):
+            stats = self.get_inviter_stats(ctx.guild.id, user_id)
+            lines.append(
+                f"**{position}.** <@{user_id}> – **{net}** "
+                f"({stats['joins']} joined, {stats['leaves']} left)"
+            )
+
+        await ctx.send(
+            "✉️ **Invite leaderboard**\n" + "\n".join(lines),
+            allowed_mentions=discord.AllowedMentions.none(),
+        )
 
 
 def setup(bot: commands.Bot):
@@ -1,52 +1,180 @@
 import os
 import json
 import asyncio
-from datetime import datetime, timedelta
+from datetime import timedelta
 
 import discord
 from discord.ext import commands
 
-# file where we store filtered words
-WORD_FILTER_FILE = "data/wordfilter.json"
+from utils.banindex import BanIndex
+from utils.modqueue import ModerationQueue
+from utils.purge import PurgeJob
+from utils.ratelimit import SlidingWindowLimiter
+from utils.storage import get_storage
+from utils.wordfilter import WordFilter
+
+# per-guild word lists in storage: guild_id -> {word: True}
+WORD_FILTER_NAMESPACE = "wordfilter"
+# present (even when the list is empty) once a guild has its own list;
+# without it the guild uses the default words. Never a word, those are non-empty.
+OWN_LIST_KEY = ""
+# the default words live under this "guild"
+DEFAULT_WORDS_GUILD = "default"
+
+# imported into storage once, then no longer written:
+# one file per guild (data/wordfilter/<guild_id>.json) and the old global list
+LEGACY_WORD_FILTER_DIR = "data/wordfilter"
+LEGACY_WORD_FILTER_FILE = "data/wordfilter.json"
 
 # optional default words (can be removed/edited)
 DEFAULT_BANNED_WORDS = ["nigga", "bitch", "nigger", "autistic", "retarded"]
 
 
-def load_filtered_words() -> list[str]:
-    """Load filtered words from JSON file."""
-    if not os.path.exists(WORD_FILTER_FILE):
-        # if file doesn't exist, create it with defaults
-        save_filtered_words(DEFAULT_BANNED_WORDS)
-        return list(DEFAULT_BANNED_WORDS)
+# per-guild anti-spam settings in storage: guild_id -> {"messages": int, "seconds": int}
+ANTISPAM_NAMESPACE = "antispam"
 
-    with open(WORD_FILTER_FILE, "r", encoding="utf-8") as f:
-        try:
-            data = json.load(f)
-        except json.JSONDecodeError:
-            # if file is corrupted, reset to defaults
-            save_filtered_words(DEFAULT_BANNED_WORDS)
-            return list(DEFAULT_BANNED_WORDS)
-
-    # make sure it's a list of strings
-    if not isinstance(data, list):
-        return list(DEFAULT_BANNED_WORDS)
+# more than 6 messages in 8 seconds => 1 minute timeout
+DEFAULT_SPAM_MESSAGES = 6
+DEFAULT_SPAM_SECONDS = 8
 
-    return [str(w).lower() for w in data]
 
-
-def save_filtered_words(words: list[str]) -> None:
-    """Save filtered words to JSON file."""
-    os.makedirs(os.path.dirname(WORD_FILTER_FILE), exist_ok=True)
-    with open(WORD_FILTER_FILE, "w", encoding="utf-8") as f:
-        json.dump(sorted(set(w.lower() for w in words)), f, indent=4)
+def _read_word_list(path: str) -> list[str] | None:
+    try:
+        with open(path, "r", encoding="utf-8") as f:
+            data = json.load(f)
+    except (OSError, json.JSONDecodeError):
+        return None
+    if not isinstance(data, list):
+        return None
+    return [str(w).lower().strip() for w in data if str(w).strip()]
+
+
+def legacy_word_rows() -> list[tuple]:
+    """Rows for the one-time import of the JSON word lists."""
+    rows = []
+    words = _read_word_list(LEGACY_WORD_FILTER_FILE)
+    if words is not None:
+        rows.append((DEFAULT_WORDS_GUILD, OWN_LIST_KEY, True))
+        rows.extend((DEFAULT_WORDS_GUILD, w, True) for w in words)
+
+    if os.path.isdir(LEGACY_WORD_FILTER_DIR):
+        for filename in os.listdir(LEGACY_WORD_FILTER_DIR):
+            guild_id, ext = os.path.splitext(filename)
+            if ext != ".json" or not guild_id.isdigit():
+                continue
+            words = _read_word_list(os.path.join(LEGACY_WORD_FILTER_DIR, filename))
+            if words is None:
+                # unreadable file: the guild kept using the defaults
+                continue
+            rows.append((guild_id, OWN_LIST_KEY, True))
+            rows.extend((guild_id, w, True) for w in words)
+    return rows
 
 
 class Moderation(commands.Cog):
     def __init__(self, bot: commands.Bot):
         self.bot = bot
         self.pending_fullclear = {}
-        self.user_message_times: dict[int, list[datetime]] = {}
+        # channel_id -> running purge task (cancellable with !cancelclear)
+        self.active_purges: dict[int, asyncio.Task] = {}
+        # guild_id -> compiled filter, loaded on the guild's first message
+        self.word_filters: dict[int, WordFilter] = {}
+        self.storage = get_storage(bot)
+        self.antispam_cfg = self.storage.load(ANTISPAM_NAMESPACE)
+        count = self.storage.import_rows(
+            WORD_FILTER_NAMESPACE, "wordfilter:json", legacy_word_rows
+        )
+        if count:
+            print(f"[Storage] Imported {count} row(s) from the word filter JSON files.")
+        # guild_id -> {word: True}, OWN_LIST_KEY marks a guild's own list
+        self.word_lists = self.storage.load(WORD_FILTER_NAMESPACE)
+        # guild_id -> limiter keyed by user ID
+        self.spam_limiters: dict[int, SlidingWindowLimiter] = {}
+        # guild_id -> ban list index, built on the first !unban by name
+        self.ban_indexes: dict[int, BanIndex] = {}
+        # deletes / warnings / timeouts from on_message are batched here
+        self.actions = ModerationQueue(ignore=(discord.Forbidden, discord.NotFound))
+
+    def cog_unload(self):
+        self.actions.close()
+        for task in self.active_purges.values():
+            task.cancel()
+
+    # ------ helpers ------
+    def get_word_filter(self, guild_id: int) -> WordFilter:
+        word_filter = self.word_filters.get(guild_id)
+        if word_filter is None:
+            word_filter = WordFilter(self.get_word_list(guild_id))
+            self.word_filters[guild_id] = word_filter
+        return word_filter
+
+    def get_word_list(self, guild_id: int | str) -> list[str]:
+        """The guild's own words, or the default ones if it never edited its list."""
+        words = self.word_lists.get(str(guild_id))
+        if words is None:
+            words = self.word_lists.get(DEFAULT_WORDS_GUILD)
+            if words is None:
+                return list(DEFAULT_BANNED_WORDS)
+        return [w for w in words if w != OWN_LIST_KEY]
+
+    async def save_word_change(self, guild_id: int, word: str, added: bool):
+        """Write one added / removed word (the whole list on a guild's first edit)."""
+        words = self.word_lists.get(str(guild_id))
+        if words is None:
+            # first edit: the guild's list starts as a copy of the defaults
+            words = {OWN_LIST_KEY: True}
+            words.update(dict.fromkeys(self.get_word_list(guild_id), True))
+            if added:
+                words[word] = True
+            else:
+                words.pop(word, None)
+            self.word_lists[str(guild_id)] = words
+            await self.storage.sync_guild(WORD_FILTER_NAMESPACE, guild_id, {}, words)
+        elif added:
+            words[word] = True
+            await self.storage.set(WORD_FILTER_NAMESPACE, guild_id, word, True)
+        else:
+            words.pop(word, None)
+            await self.storage.delete(WORD_FILTER_NAMESPACE, guild_id, word)
+
+    def get_spam_limiter(self, guild_id: int) -> SlidingWindowLimiter:
+        limiter = self.spam_limiters.get(guild_id)
+        if limiter is None:
+            cfg = self.antispam_cfg.get(str(guild_id), {})
+            limiter = SlidingWindowLimiter(
+                cfg.get("messages", DEFAULT_SPAM_MESSAGES),
+                cfg.get("seconds", DEFAULT_SPAM_SECONDS),
+            )
+            self.spam_limiters[guild_id] = limiter
+        return limiter
+
+    async def get_ban_index(self, guild: discord.Guild) -> BanIndex:
+        index = self.ban_indexes.get(guild.id)
+        if index is None:
+            index = BanIndex()
+            async for ban_entry in guild.bans(limit=None):
+                user = ban_entry.user
+                index.add(user.id, user.name, user.discriminator)
+            self.ban_indexes[guild.id] = index
+        return index
+
+    @commands.Cog.listener()
+    async def on_guild_remove(self, guild: discord.Guild):
+        self.word_filters.pop(guild.id, None)
+        self.spam_limiters.pop(guild.id, None)
+        self.ban_indexes.pop(guild.id, None)
+
+    @commands.Cog.listener()
+    async def on_member_ban(self, guild: discord.Guild, user: discord.User):
+        index = self.ban_indexes.get(guild.id)
+        if index is not None:
+            index.add(user.id, user.name, user.discriminator)
+
+    @commands.Cog.listener()
+    async def on_member_unban(self, guild: discord.Guild, user: discord.User):
+        index = self.ban_indexes.get(guild.id)
+        if index is not None:
+            index.remove(user.id)
 
     # --------- Filter + anti-spam ----------
     @commands.Cog.listener()
@@ -59,53 +187,54 @@ class Moderation(commands.Cog):
         if not message.guild:
             return
 
-        # word filter
-        content = message.content.lower()
-        filtered_words = load_filtered_words()
-
-        for bad_word in filtered_words:
-            if bad_word and bad_word in content:
-                try:
-                    await message.delete()
-                except discord.Forbidden:
-                    pass
-                except discord.NotFound:
-                    pass
-
-                try:
-                    await message.channel.send(
-                        f"{message.author.mention}, watch your language.",
-                        delete_after=8,
-                    )
-                except discord.Forbidden:
-                    pass
-
-                # don't continue with spam check if we already deleted the message
-                return
+        # word filter (normalizes leetspeak / homoglyphs / invisible chars itself)
+        if self.get_word_filter(message.guild.id).search(message.content):
+            self.actions.delete(message)
+            self.actions.warn(message.channel, message.author.mention, "watch your language.")
+
+            # don't continue with spam check if we already deleted the message
+            return
 
         # anti-spam (too many messages in short time)
-        now = datetime.utcnow()
-        uid = message.author.id
+        limiter = self.get_spam_limiter(message.guild.id)
+        if limiter.hit(message.author.id):
+            self.actions.warn(message.channel, message.author.mention, "you gotta chill out.")
+            self.actions.timeout(
+                message.author,
+                discord.utils.utcnow() + timedelta(minutes=1),
+                "Spam (auto)",
+            )
 
-        times = self.user_message_times.get(uid, [])
-        # keep only messages from last 8 seconds
-        times = [t for t in times if (now - t).total_seconds() <= 8]
-        times.append(now)
-        self.user_message_times[uid] = times
+    @commands.command(name="antispam")
+    @commands.has_permissions(manage_guild=True)
+    async def antispam(self, ctx, messages: int = None, seconds: int = None):
+        """
+        View or change the anti-spam limit.
+        Usage:
+        !antispam              -> shows current limit
+        !antispam <messages> <seconds>
+        """
+        limiter = self.get_spam_limiter(ctx.guild.id)
 
-        # more than 6 messages in 8 seconds => 1 minute timeout
-        if len(times) > 6:
-            try:
-                await message.channel.send(
-                    f"{message.author.mention}, you gotta chill out.",
-                    delete_after=8,
-                )
-                await message.author.edit(
-                    timed_out_until=discord.utils.utcnow() + timedelta(minutes=1),
-                    reason="Spam (auto)",
-                )
-            except discord.Forbidden:
-                pass
+        if messages is None:
+            return await ctx.send(
+                f"Anti-spam: more than `{limiter.limit}` messages "
+                f"in `{int(limiter.window)}` seconds => 1 minute timeout."
+            )
+
+        if seconds is None:
+            return await ctx.send("Usage: `!antispam <messages> <seconds>`")
+
+        if messages < 1 or seconds < 1:
+            return await ctx.send("Messages and seconds must be at least 1.")
+
+        self.antispam_cfg[str(ctx.guild.id)] = {"messages": messages, "seconds": seconds}
+        await self.storage.set(ANTISPAM_NAMESPACE, ctx.guild.id, "messages", messages)
+        await self.storage.set(ANTISPAM_NAMESPACE, ctx.guild.id, "seconds", seconds)
+        # rebuilt with the new settings on the next message
+        self.spam_limiters.pop(ctx.guild.id, None)
+
+        await ctx.send(f"Anti-spam set to `{messages}` messages in `{seconds}` seconds ✅")
 
     # word filter commands
 
@@ -113,7 +242,7 @@ class Moderation(commands.Cog):
     @commands.has_permissions(moderate_members=True)
     async def wordlist(self, ctx, action: str = None, *, word: str | None = None):
         """
-        Manage filtered words.
+        Manage this server's filtered words.
         Usage:
         !wordlist add <word>
         !wordlist remove <word>
@@ -125,18 +254,17 @@ class Moderation(commands.Cog):
             )
 
         action = action.lower()
-        words = load_filtered_words()
+        word_filter = self.get_word_filter(ctx.guild.id)
 
         if action == "add":
             if not word:
                 return await ctx.send("Usage: `!wordlist add <word>`")
 
             w = word.lower().strip()
-            if w in words:
+            if not word_filter.add(w):
                 return await ctx.send("That word is already in the filter list.")
 
-            words.append(w)
-            save_filtered_words(words)
+            await self.save_word_change(ctx.guild.id, w, added=True)
             return await ctx.send(f"Added `{w}` to the filter list ✅")
 
         elif action == "remove":
@@ -144,17 +272,16 @@ class Moderation(commands.Cog):
                 return await ctx.send("Usage: `!wordlist remove <word>`")
 
             w = word.lower().strip()
-            if w not in words:
+            if not word_filter.remove(w):
                 return await ctx.send("That word is not in the filter list.")
 
-            words.remove(w)
-            save_filtered_words(words)
+            await self.save_word_change(ctx.guild.id, w, added=False)
             return await ctx.send(f"Removed `{w}` from the filter list ❌")
 
         elif action == "list":
-            if not words:
+            if not len(word_filter):
                 return await ctx.send("No filtered words are set.")
-            formatted = ", ".join(f"`{w}`" for w in words)
+            formatted = ", ".join(f"`{w}`" for w in word_filter.words)
             return await ctx.send(f"📛 **Filtered words:**\n{formatted}")
 
         else:
@@ -171,9 +298,15 @@ class Moderation(commands.Cog):
         if amount <= 0:
             return await ctx.send("Amount must be at least 1.")
 
-        deleted = await ctx.channel.purge(limit=amount + 1)
+        job = PurgeJob(
+            ctx.channel,
+            limit=amount + 1,
+            ignore=(discord.NotFound,),
+            bulk_errors=(discord.HTTPException,),
+        )
+        deleted = await job.run()
         await ctx.send(
-            f"I deleted {len(deleted) - 1} messages 🧹",
+            f"I deleted {deleted - 1} messages 🧹",
             delete_after=5,
         )
 
@@ -227,17 +360,58 @@ class Moderation(commands.Cog):
 
         channel = ctx.channel
 
+        if channel.id in self.active_purges:
+            await ctx.send("❌ A full clear is already running in this channel.")
+            return
+
+        status = await ctx.send("🧹 **Full clear started…** Type `!cancelclear` to stop it.")
+
+        async def show_progress(job: PurgeJob):
+            await status.edit(
+                content=(
+                    f"🧹 **Full clear in progress…** Deleted `{job.deleted}` messages "
+                    f"so far ({int(job.elapsed)}s). Type `!cancelclear` to stop it."
+                )
+            )
+
+        job = PurgeJob(
+            channel,
+            skip_ids={status.id},
+            progress=show_progress,
+            ignore=(discord.NotFound,),
+            bulk_errors=(discord.HTTPException,),
+        )
+        task = self.bot.loop.create_task(job.run())
+        self.active_purges[channel.id] = task
+
         try:
-            deleted = await channel.purge()
-            await ctx.send(
-                f"✅ **Full clear successful!** Deleted `{len(deleted)}` messages.",
-                delete_after=5
+            await task
+            await status.edit(
+                content=f"✅ **Full clear successful!** Deleted `{job.deleted}` messages.",
+                delete_after=5,
             )
 
+        except asyncio.CancelledError:
+            if not task.cancelled():
+                raise
+            await status.edit(
+                content=f"🛑 **Full clear cancelled.** Deleted `{job.deleted}` messages before stopping."
+            )
         except discord.Forbidden:
-            await ctx.send("❌ I don’t have permission to delete messages.")
+            await status.edit(content="❌ I don’t have permission to delete messages.")
         except Exception as e:
-            await ctx.send(f"❌ An error occurred:\n```{e}```")
+            await status.edit(content=f"❌ An error occurred:\n```{e}```")
+        finally:
+            self.active_purges.pop(channel.id, None)
+
+    @commands.command(name="cancelclear")
+    @commands.has_permissions(manage_messages=True)
+    async def cancelclear(self, ctx):
+        """Stop a running full clear in this channel."""
+        task = self.active_purges.get(ctx.channel.id)
+        if task is None:
+            return await ctx.send("❌ No full clear is running in this channel.")
+        task.cancel()
 
     # -------------------------------------------------
 
@@ -279,29 +453,36 @@ class Moderation(commands.Cog):
     @commands.command(name="unban")
     @commands.has_permissions(ban_members=True)
     async def unban(self, ctx, *, user: str):
-        """Unban someone by name#discriminator or ID."""
-        banned_users = await ctx.guild.fetch_members().flatten()
-
-        # user can be "name#discrim" or just id
+        """Unban someone by name, name#discriminator or ID."""
+        # user can be "name", "name#discrim" or just id
         try:
             user_id = int(user)
         except ValueError:
             user_id = None
 
-        if user_id is not None:
-            # try unban by ID
-            for ban_entry in await ctx.guild.bans():
-                if ban_entry.user.id == user_id:
-                    await ctx.guild.unban(ban_entry.user)
-                    return await ctx.send(f"Unbanned {ban_entry.user} ✅")
-        else:
-            name, discrim = user.split("#")
-            for ban_entry in await ctx.guild.bans():
-                if ban_entry.user.name == name and ban_entry.user.discriminator == discrim:
-                    await ctx.guild.unban(ban_entry.user)
-                    return await ctx.send(f"Unbanned {ban_entry.user} ✅")
+        if user_id is None:
+            try:
+                index = await self.get_ban_index(ctx.guild)
+            except discord.Forbidden:
+                return await ctx.send("I can't see the ban list.")
+            user_id = index.find(user)
+            if user_id is None:
+                return await ctx.send("User not found in ban list.")
 
-        await ctx.send("User not found in ban list.")
+        # unban by ID directly, no need to walk the ban list
+        try:
+            await ctx.guild.unban(discord.Object(id=user_id))
+        except discord.NotFound:
+            return await ctx.send("User not found in ban list.")
+        except discord.Forbidden:
+            return await ctx.send("Can't unban this one.")
+
+        index = self.ban_indexes.get(ctx.guild.id)
+        name = None
+        if index is not None:
+            name = index.by_id.get(user_id)
+            index.remove(user_id)
+        await ctx.send(f"Unbanned {name or user_id} ✅")
 
     # --------- Timeout / Un-timeout (text mute) ----------
 
@@ -1,15 +1,35 @@
 import os
 import asyncio
+import json
+import statistics
+import time
+from collections import deque
+
 import discord
 from discord.ext import commands
-import yt_dlp as youtube_dl
 
+from utils.audiocache import AudioCache
+from utils.extraction import ExtractionService, ExtractorBusy
+from utils.ytcache import ExtractionCache, stream_url_expiry
+from utils.ytworker import make_executor, run_extract
 
 BASE_DIR = os.path.dirname(os.path.abspath(os.path.join(__file__, "..")))
 FFMPEG_PATH = os.path.join(BASE_DIR, "ffmpeg", "bin", "ffmpeg.exe")
 
 print("FFMPEG_PATH =", FFMPEG_PATH, "| exists:", os.path.exists(FFMPEG_PATH))
 
+CONFIG_PATH = "config.json"
+
+
+def load_config() -> dict:
+    if not os.path.exists(CONFIG_PATH):
+        return {}
+    with open(CONFIG_PATH, "r", encoding="utf-8") as f:
+        return json.load(f)
+
+
+config = load_config()
+
 # ----------------- YTDL / FFMPEG CONFIG -----------------
 
 ytdl_format_options = {
@@ -37,80 +57,344 @@ ffmpeg_options = {
     "options": "-vn -loglevel error",
 }
 
-ytdl = youtube_dl.YoutubeDL(ytdl_format_options)
-
-# separate YoutubeDL instance for playlists (we allow playlists here)
+# separate options for playlists (we allow playlists here)
 playlist_ytdl_options = dict(ytdl_format_options)
 playlist_ytdl_options["noplaylist"] = False
 playlist_ytdl_options["extract_flat"] = "in_playlist"  # we only need basic info
-playlist_ytdl = youtube_dl.YoutubeDL(playlist_ytdl_options)
 
+# popular tracks are downloaded once and kept as Opus files (LRU, size-capped)
+AUDIO_CACHE_DIR = "data/audio_cache"
+audio_cache = AudioCache(
+    AUDIO_CACHE_DIR,
+    config.get("audio_cache_mb", 2048) * 2**20,
+    min_plays=config.get("audio_cache_min_plays", 2),
+)
+
+# downloads go straight into the audio cache; YouTube audio is usually Opus
+# already, so FFmpegExtractAudio just remuxes it into an .opus (Ogg) file
+download_ytdl_options = dict(ytdl_format_options)
+download_ytdl_options["outtmpl"] = os.path.join(AUDIO_CACHE_DIR, "%(id)s.%(ext)s")
+download_ytdl_options["postprocessors"] = [
+    {"key": "FFmpegExtractAudio", "preferredcodec": "opus"}
+]
+if os.path.exists(FFMPEG_PATH):
+    download_ytdl_options["ffmpeg_location"] = FFMPEG_PATH
+
+# dedicated yt-dlp workers (threads, or processes with "ytdl_processes": true)
+# with per-guild fair queuing; each worker keeps its own warm YoutubeDL instances
+extraction_service = ExtractionService(
+    run_extract,
+    workers=config.get("ytdl_workers", 4),
+    max_queue=config.get("ytdl_max_queue", 50),
+    max_per_guild=config.get("ytdl_max_queue_per_guild", 10),
+    executor=make_executor(
+        {
+            "single": ytdl_format_options,
+            "playlist": playlist_ytdl_options,
+            "download": download_ytdl_options,
+        },
+        workers=config.get("ytdl_workers", 4),
+        processes=config.get("ytdl_processes", False),
+    ),
+)
+
+# query -> video ID -> stream URL cache, shared by all guilds (set path to None to keep it in memory only)
+YTDL_CACHE_PATH = "data/ytdl_cache.json"
+YTDL_CACHE_SAVE_EVERY = 600  # seconds
+extraction_cache = ExtractionCache(path=YTDL_CACHE_PATH)
 
+BUSY_MESSAGE = "⏳ The music extractor is busy right now, try again in a few seconds."
 
-class YTDLSource(discord.PCMVolumeTransformer):
+
+
+async def extract_info(
+    query: str, *, guild_id: int, download: bool = False, priority: bool = False
+) -> dict:
+    """
+    Runs yt-dlp for a song name or URL and returns the info of the first result.
+    Automatically searches YouTube if no direct link is provided.
+    Streaming lookups go through the extraction cache.
+    Raises ExtractorBusy if the extraction queue is full, unless `priority`
+    is set: resolving a queued track's stream URL waits its turn ahead of
+    new searches instead of being refused.
+    """
+
+    direct_url = None
+    if not download:
+        cached = extraction_cache.get(query)
+        if cached:
+            return cached
+        # query seen before but its stream URL expired: skip the search
+        direct_url = extraction_cache.video_url_for(query)
+
+    # If it's not a direct URL, treat it as a YouTube search
+    if direct_url:
+        search_query = direct_url
+    elif not query.startswith(("http://", "https://")):
+        search_query = f"ytsearch1:{query}"
+    else:
+        search_query = query
+
+    start = time.perf_counter()
+    try:
+        kind = "download" if download else "single"
+        data = await extraction_service.extract(
+            guild_id, kind, search_query, download, priority=priority
+        )
+    except ExtractorBusy:
+        raise
+    except Exception as e:
+        print("[YTDL] extract_info error:", e)
+        raise
+    elapsed = time.perf_counter() - start
+
+    if data is None:
+        raise RuntimeError("yt-dlp returned no data.")
+
+    # Search or playlist result → take first valid entry
+    if "entries" in data:
+        entries = [e for e in data["entries"] if e]
+        if not entries:
+            raise RuntimeError("No valid results found.")
+        data = entries[0]
+
+    if download:
+        return data
+    return extraction_cache.put(query, data, elapsed)
+
+
+class Track:
     """
-    Audio source created by yt-dlp + FFmpeg.
-    Stores song metadata like title and requester.
+    Lightweight queue entry: just what's needed to show it in the queue
+    and resolve it later. The stream URL and ffmpeg process are only
+    created right before the track plays.
     """
 
-    def __init__(self, source, *, data, requester, volume: float = 1.0):
-        super().__init__(source, volume)
-        self.data = data
+    __slots__ = (
+        "id", "title", "url", "duration", "requester", "stream_url", "expires_at", "opus_stream"
+    )
+
+    def __init__(self, *, id, title, url, duration=None, requester=None):
+        self.id = id
+        self.title = title
+        self.url = url
+        self.duration = duration
         self.requester = requester
-        self.title = data.get("title")
-        self.url = data.get("webpage_url") or data.get("url")
+        self.stream_url: str | None = None
+        self.expires_at: float | None = None
+        # the stream is 48 kHz Opus already, so it can be passed through as-is
+        self.opus_stream = False
 
     @classmethod
-    async def from_query(cls, query: str, *, loop, requester, stream: bool = True):
-        """
-        Creates an audio source from a song name or URL.
-        Automatically searches YouTube if no direct link is provided.
-        """
+    def from_info(cls, data: dict, requester) -> "Track":
+        """Track from a full yt-dlp result (keeps the stream URL it already has)."""
+        track = cls(
+            id=data.get("id"),
+            title=data.get("title"),
+            url=data.get("webpage_url") or data.get("url"),
+            duration=data.get("duration"),
+            requester=requester,
+        )
+        track.set_stream(data)
+        return track
 
-        # If it's not a direct URL, treat it as a YouTube search
-        if not query.startswith(("http://", "https://")):
-            search_query = f"ytsearch1:{query}"
-        else:
-            search_query = query
-
-        def run():
-            return ytdl.extract_info(search_query, download=not stream)
+    @classmethod
+    def from_flat_entry(cls, entry: dict, requester) -> "Track | None":
+        """Track from an `extract_flat` playlist entry, nothing is resolved yet."""
+        # with extract_flat, 'id' is usually the video ID
+        video_id = entry.get("id") or entry.get("url")
+        if not video_id:
+            return None
+        return cls(
+            id=video_id,
+            title=entry.get("title") or video_id,
+            url=f"https://www.youtube.com/watch?v={video_id}",
+            duration=entry.get("duration"),
+            requester=requester,
+        )
+
+    def set_stream(self, data: dict):
+        self.stream_url = data.get("url")
+        self.expires_at = stream_url_expiry(self.stream_url)
+        self.opus_stream = data.get("acodec") == "opus" and data.get("asr") in (None, 48000)
 
-        try:
-            data = await loop.run_in_executor(None, run)
-        except Exception as e:
-            print("[YTDL] extract_info error:", e)
-            raise
+    @property
+    def needs_resolve(self) -> bool:
+        if not self.stream_url:
+            return True
+        if self.expires_at is None:
+            return False
+        # give it a minute of slack, ffmpeg needs to open it
+        return self.expires_at - time.time() < 60
 
-        if data is None:
-            raise RuntimeError("yt-dlp returned no data.")
+    async def resolve(self, *, guild_id: int):
+        """Fetch a fresh stream URL if there's none yet or it's about to expire."""
+        if self.needs_resolve:
+            data = await extract_info(self.url, guild_id=guild_id, priority=True)
+            self.set_stream(data)
+            if not self.title:
+                self.title = data.get("title")
 
-        # Search or playlist result → take first valid entry
-        if "entries" in data:
-            entries = [e for e in data["entries"] if e]
-            if not entries:
-                raise RuntimeError("No valid results found.")
-            data = entries[0]
 
-        print("[YTDL] Title:", data.get("title"))
-        print("[YTDL] Stream URL:", data.get("url"))
+class YTDLSource(discord.FFmpegOpusAudio):
+    """
+    Audio source created by yt-dlp + FFmpeg, handed to Discord as Opus.
+    Wraps the Track it plays (title, requester...).
 
-        audio_url = data["url"] if stream else ytdl.prepare_filename(data)
-        executable = FFMPEG_PATH if os.path.exists(FFMPEG_PATH) else "ffmpeg"
+    Volume is applied by ffmpeg's volume filter, so nothing is done to the
+    audio in Python. At 100% an Opus input (cached files, most YouTube
+    streams) is passed through without being decoded at all.
+    """
 
-        print("[YTDL] Using ffmpeg executable:", executable)
+    # seconds of audio in one Opus packet
+    FRAME = 0.02
+    # packets read ahead before a reopened source is swapped in (0.5 s), so
+    # the audio thread never waits on the new ffmpeg right after the swap
+    PRIME_PACKETS = 25
+
+    def __init__(
+        self,
+        location: str,
+        *,
+        track: Track,
+        volume: float = 1.0,
+        start: float = 0.0,
+        local: bool = False,
+        opus_input: bool = False,
+    ):
+        self.track = track
+        self.location = location
+        self.volume = volume
+        self.start = start
+        self.local = local
+        self.opus_input = opus_input
+        # packets handed to the player (or skipped) so far
+        self.frames = 0
+        # packets read from ffmpeg ahead of the player, see catch_up()
+        self._ahead: deque[bytes] = deque()
+
+        before = [] if local else [ffmpeg_options["before_options"]]
+        if start:
+            before.append(f"-ss {start:.3f}")
+        options = ffmpeg_options["options"]
+        if volume != 1.0:
+            options += f" -af volume={volume:.3f}"
 
         try:
-            audio = discord.FFmpegPCMAudio(
-                audio_url,
-                executable=executable,
-                **ffmpeg_options,
+            super().__init__(
+                location,
+                # "opus" makes discord copy the packets instead of encoding with libopus
+                codec="opus" if self.passthrough else None,
+                executable=ffmpeg_executable(),
+                before_options=" ".join(before) or None,
+                options=options,
             )
         except Exception as e:
             print("[FFMPEG] Error:", e)
             raise
 
-        return cls(audio, data=data, requester=requester)
+    @property
+    def title(self):
+        return self.track.title
+
+    @property
+    def requester(self):
+        return self.track.requester
+
+    @property
+    def url(self):
+        return self.track.url
+
+    @property
+    def passthrough(self) -> bool:
+        return self.opus_input and self.volume == 1.0
+
+    @property
+    def position(self) -> float:
+        """Seconds into the track."""
+        return self.start + self.frames * self.FRAME
+
+    def read(self) -> bytes:
+        if self._ahead:
+            data = self._ahead.popleft()
+        else:
+            data = super().read()
+        if data:
+            self.frames += 1
+        return data
+
+    @property
+    def primed(self) -> bool:
+        return bool(self._ahead)
+
+    def skip_to(self, position: float):
+        """Drops read-ahead packets that end before `position`."""
+        while self._ahead and self.position + self.FRAME / 2 <= position:
+            self._ahead.popleft()
+            self.frames += 1
+
+    def catch_up(self, other: "YTDLSource") -> bool:
+        """
+        Blocking. Reads this source until it is at the position `other` is
+        playing, then PRIME_PACKETS further, keeping those packets so the
+        swap doesn't stall on ffmpeg. False if the stream ended first.
+        """
+        while len(self._ahead) < self.PRIME_PACKETS:
+            data = super().read()
+            if not data:
+                break
+            self._ahead.append(data)
+            self.skip_to(other.position)
+        self.skip_to(other.position)
+        return self.primed
+
+    def reopen(self, *, volume: float, location: str | None = None) -> "YTDLSource":
+        """Opens the same track again from the current position, at another volume."""
+        return YTDLSource(
+            location or self.location,
+            track=self.track,
+            volume=volume,
+            start=self.position,
+            local=self.local,
+            opus_input=self.opus_input,
+        )
+
+    @classmethod
+    async def from_track(cls, track: Track, *, guild_id: int, volume: float = 1.0):
+        """Resolves the track's stream URL (if needed) and opens it with FFmpeg."""
+        await track.resolve(guild_id=guild_id)
+        print("[YTDL] Title:", track.title)
+        return cls(track.stream_url, track=track, volume=volume, opus_input=track.opus_stream)
+
+def ffmpeg_executable() -> str:
+    return FFMPEG_PATH if os.path.exists(FFMPEG_PATH) else "ffmpeg"
+
+
+async def open_track(track: Track, *, guild_id: int, volume: float = 1.0) -> YTDLSource:
+    """Opens a track for playback, from the audio cache if it's there."""
+    path = audio_cache.get(track.id)
+    if path is None:
+        return await YTDLSource.from_track(track, guild_id=guild_id, volume=volume)
+    return YTDLSource(path, track=track, volume=volume, local=True, opus_input=True)
+
+
+async def cache_track(track: Track, *, guild_id: int) -> str | None:
+    """
+    Download a track into the audio cache in the background. Queued like
+    any other request: when the extractor is busy the download is skipped
+    (the track is streamed instead), never pushed ahead of other guilds.
+    """
+    audio_cache.pending.add(track.id)
+    try:
+        await extract_info(track.url, guild_id=guild_id, download=True)
+    except ExtractorBusy:
+        audio_cache.pending.discard(track.id)
+        return None
+    except Exception as e:
+        audio_cache.pending.discard(track.id)
+        print("[Music] Failed to cache", track.title, "-", e)
+        return None
+    return audio_cache.add(track.id)
 
 
 class GuildMusicPlayer:
@@ -121,10 +405,24 @@ class GuildMusicPlayer:
     def __init__(self, bot: commands.Bot, guild: discord.Guild):
         self.bot = bot
         self.guild = guild
-        self.queue: list[YTDLSource] = []
+        self.queue: list[Track] = []
         self.current: YTDLSource | None = None
         self.text_channel: discord.TextChannel | None = None
         self.volume: float = 1.0
+        self.prefetch_task: asyncio.Task | None = None
+        # next track with its ffmpeg pipeline already open, ready for a gapless handoff
+        self.prefetched: tuple[Track, YTDLSource] | None = None
+        # seconds between a track ending and the next one starting (last 50 transitions)
+        self.gaps: deque[float] = deque(maxlen=50)
+        self.track_ended_at: float | None = None
+        # seconds between a track ending and the player task waking up (last 50 transitions)
+        self.wakeups: deque[float] = deque(maxlen=50)
+        # set from the audio thread when the current track ends
+        self.track_done = asyncio.Event()
+        # runs player_loop() while there's something to play
+        self.player_task: asyncio.Task | None = None
+        # True while the current track is being reopened at a new volume
+        self.switching_volume = False
 
     @property
     def voice(self) -> discord.VoiceClient | None:
@@ -134,73 +432,223 @@ class GuildMusicPlayer:
         vc = self.voice
         return vc is not None and vc.is_playing()
 
-    async def add_to_queue(self, source: YTDLSource, channel: discord.TextChannel):
+    async def add_to_queue(self, track: Track, channel: discord.TextChannel):
         """
-        Adds a song to the queue and starts playback if nothing is playing.
+        Adds a track to the queue and starts playback if nothing is playing.
         """
-        self.queue.append(source)
+        self.queue.append(track)
         self.text_channel = channel
-        print("[Music] Added to queue:", source.title)
+        print("[Music] Added to queue:", track.title)
 
-        if not self.is_playing():
-            await self.start_next()
+        if self.player_task is None:
+            self.player_task = self.bot.loop.create_task(self.player_loop())
+        elif len(self.queue) == 1:
+            self.prefetch_next()
 
-    async def start_next(self):
+    def prefetch_next(self):
         """
-        Starts the next song or disconnects if the queue is empty.
+        Resolve the next track and open its ffmpeg pipeline in the background,
+        while the current one is still playing.
         """
-        vc = self.voice
-
-        if vc is None or not vc.is_connected():
-            print("[Music] Voice client not connected — clearing queue.")
-            self.queue.clear()
-            self.current = None
-            return
-
         if not self.queue:
-            print("[Music] Queue empty — disconnecting.")
-            self.current = None
-            await vc.disconnect()
-            if self.text_channel:
-                await self.text_channel.send("👋 Queue is empty. Leaving the voice channel.")
+            return
+        track = self.queue[0]
+        if self.prefetched and self.prefetched[0] is track:
+            return
+        if self.prefetch_task and not self.prefetch_task.done():
             return
 
-        self.current = self.queue.pop(0)
-        self.current.volume = self.volume
+        async def _prefetch():
+            try:
+                source = await open_track(
+                    track, guild_id=self.guild.id, volume=self.volume
+                )
+            except Exception as e:
+                # start_next will try again and report it
+                print("[Music] Prefetch failed:", e)
+                return
+
+            # the queue may have changed while we were resolving
+            if self.queue and self.queue[0] is track:
+                self.drop_prefetched()
+                self.prefetched = (track, source)
+            else:
+                source.cleanup()
+
+        self.prefetch_task = self.bot.loop.create_task(_prefetch())
+
+    def take_prefetched(self, track: Track) -> YTDLSource | None:
+        """The prefetched source for `track`, if it was opened at the current volume."""
+        if not self.prefetched or self.prefetched[0] is not track:
+            self.drop_prefetched()
+            return None
+
+        source = self.prefetched[1]
+        if source.volume != self.volume:
+            self.drop_prefetched()
+            return None
+        self.prefetched = None
+        return source
+
+    def drop_prefetched(self):
+        """Kill the ffmpeg process of a prefetched track that won't be played."""
+        if self.prefetched:
+            self.prefetched[1].cleanup()
+            self.prefetched = None
+
+    def record_gap(self):
+        if self.track_ended_at is not None:
+            self.gaps.append(time.perf_counter() - self.track_ended_at)
+            self.track_ended_at = None
+
+    async def player_loop(self):
+        """
+        Plays the queue track after track. The audio thread's `after` callback
+        only sets track_done; resolving, ffmpeg and messages all happen here.
+        """
+        try:
+            while True:
+                try:
+                    playing = await self.start_next()
+                except Exception as e:
+                    print("[Music] Error while playing next:", e)
+                    playing = self.current is not None
+                if not playing:
+                    return
+
+                await self.track_done.wait()
+                if self.track_ended_at is not None:
+                    self.wakeups.append(time.perf_counter() - self.track_ended_at)
+        finally:
+            self.player_task = None
+
+    async def start_next(self) -> bool:
+        """
+        Starts the next song. Returns False when there's nothing left to play
+        (disconnecting if the queue is empty).
+        """
+        while True:
+            if self.prefetch_task and not self.prefetch_task.done():
+                # the next track is already being prepared, let it finish
+                await asyncio.wait({self.prefetch_task})
+
+            vc = self.voice
+
+            if vc is None or not vc.is_connected():
+                print("[Music] Voice client not connected — clearing queue.")
+                self.queue.clear()
+                self.drop_prefetched()
+                self.current = None
+                return False
+
+            if not self.queue:
+                print("[Music] Queue empty — disconnecting.")
+                self.current = None
+                await vc.disconnect()
+                if self.text_channel:
+                    await self.text_channel.send("👋 Queue is empty. Leaving the voice channel.")
+                return False
+
+            track = self.queue.pop(0)
+
+            try:
+                self.current = self.take_prefetched(track)
+                if self.current is None:
+                    self.current = await open_track(
+                        track, guild_id=self.guild.id, volume=self.volume
+                    )
+                break
+            except ExtractorBusy:
+                # not the track's fault: keep it and try again shortly
+                self.queue.insert(0, track)
+                await asyncio.sleep(2)
+                continue
+            except Exception as e:
+                print("[Music] Failed to resolve track:", e)
+                self.current = None
+                if self.text_channel:
+                    await self.text_channel.send(f"❌ **Skipping** {track.title}: `{e}`")
 
         print("[Music] Now playing:", self.current.title)
 
         def _after(error: Exception | None):
+            # runs on the audio thread: just wake up the player task, never block here
             if error:
                 print("[Music] Playback error:", error)
+            self.track_ended_at = time.perf_counter()
+            self.bot.loop.call_soon_threadsafe(self.track_done.set)
 
-            fut = asyncio.run_coroutine_threadsafe(self.start_next(), self.bot.loop)
-            try:
-                fut.result()
-            except Exception as e:
-                print("[Music] Error while playing next:", e)
-
+        self.track_done.clear()
         try:
             vc.play(self.current, after=_after)
         except Exception as e:
             print("[Music] vc.play() error:", e)
-
+            self.current = None
             if self.text_channel:
-                asyncio.run_coroutine_threadsafe(
-                    self.text_channel.send(
-                        f"❌ **Failed to start playback:** `{e}`"
-                    ),
-                    self.bot.loop,
-                )
+                await self.text_channel.send(f"❌ **Failed to start playback:** `{e}`")
+            return False
 
-            self.current = None
-            return
+        self.record_gap()
+        self.prefetch_next()
+        if audio_cache.record_play(track.id):
+            self.bot.loop.create_task(cache_track(track, guild_id=self.guild.id))
 
         if self.text_channel:
             await self.text_channel.send(
                 f"🎶 **Now playing:** {self.current.title} "
                 f"(requested by {self.current.requester.mention})"
             )
+        return True
+
+    async def apply_volume(self):
+        """
+        Switches the current track to the new volume. The volume lives in
+        ffmpeg's filter graph, so a second ffmpeg is started at the current
+        position and swapped in once it has caught up and has half a second
+        read ahead, so the audio thread never waits on it.
+        """
+        vc = self.voice
+        source = self.current
+        if vc is None or source is None or vc.source is not source:
+            return
+        if source.volume == self.volume or self.switching_volume:
+            return
+
+        self.switching_volume = True
+        try:
+            location = None
+            if not source.local:
+                await source.track.resolve(guild_id=self.guild.id)
+                location = source.track.stream_url
+            new = source.reopen(volume=self.volume, location=location)
+
+            # the old source keeps playing while ffmpeg opens, seeks and reads ahead
+            while True:
+                caught_up = await self.bot.loop.run_in_executor(None, new.catch_up, source)
+                if not caught_up or vc.source is not source:
+                    new.cleanup()
+                    return
+                # drop what the old source played while we were getting back here
+                new.skip_to(source.position)
+                if new.primed:
+                    break
+
+            paused = vc.is_paused()
+            vc.source = new
+            if paused:
+                vc.pause()
+            self.current = new
+            # the audio thread may still be in the middle of a read on the old one
+            self.bot.loop.call_later(1.0, source.cleanup)
+        except Exception as e:
+            print("[Music] Failed to switch volume:", e)
+            return
+        finally:
+            self.switching_volume = False
+
+        # the volume may have changed again while we were switching
+        if new.volume != self.volume:
+            await self.apply_volume()
 
     def stop(self):
         """
@@ -212,6 +660,9 @@ class GuildMusicPlayer:
 
         self.queue.clear()
         self.current = None
+        if self.prefetch_task:
+            self.prefetch_task.cancel()
+        self.drop_prefetched()
 
         print("[Music] Playback stopped. Queue cleared.")
 
@@ -223,6 +674,23 @@ class Music(commands.Cog):
     def __init__(self, bot: commands.Bot):
         self.bot = bot
         self.players: dict[int, GuildMusicPlayer] = {}
+        self.cache_task = self.bot.loop.create_task(self.save_cache_periodically())
+
+    def cog_unload(self):
+        self.cache_task.cancel()
+        for player in self.players.values():
+            if player.player_task:
+                player.player_task.cancel()
+        extraction_cache.save()
+        extraction_service.close()
+
+    async def save_cache_periodically(self):
+        while True:
+            await asyncio.sleep(YTDL_CACHE_SAVE_EVERY)
+            try:
+                extraction_cache.save()
+            except OSError as e:
+                print("[Music] Failed to save extraction cache:", e)
 
     # helpers
 
@@ -397,11 +865,11 @@ class Music(commands.Cog):
 
         # playlist handling
         if self._is_youtube_playlist(query):
-            def run_playlist():
-                return playlist_ytdl.extract_info(query, download=False)
-
             try:
-                data = await self.bot.loop.run_in_executor(None, run_playlist)
+                data = await extraction_service.extract(ctx.guild.id, "playlist", query)
+            except ExtractorBusy:
+                await status_msg.edit(content=BUSY_MESSAGE)
+                return
             except Exception as e:
                 print("[Music] Playlist extract error:", e)
                 await status_msg.edit(content=f"❌ Error while loading playlist: `{e}`")
@@ -412,32 +880,19 @@ class Music(commands.Cog):
                 await status_msg.edit(content="❌ No tracks found in this playlist.")
                 return
 
-            max_tracks = 50  # safety limit
+            # queue entries are just metadata, so long playlists are cheap
+            max_tracks = 500  # safety limit
             added = 0
 
             for entry in entries[:max_tracks]:
                 if not entry:
                     continue
 
-                # with extract_flat, 'id' is usually the video ID
-                video_id = entry.get("id") or entry.get("url")
-                if not video_id:
-                    continue
-
-                video_url = f"https://www.youtube.com/watch?v={video_id}"
-
-                try:
-                    source = await YTDLSource.from_query(
-                        video_url,
-                        loop=self.bot.loop,
-                        requester=ctx.author,
-                        stream=True,
-                    )
-                except Exception as e:
-                    print("[Music] Error while adding playlist entry:", e)
+                track = Track.from_flat_entry(entry, ctx.author)
+                if track is None:
                     continue
 
-                await player.add_to_queue(source, ctx.channel)
+                await player.add_to_queue(track, ctx.channel)
                 added += 1
 
             if added == 0:
@@ -451,19 +906,18 @@ class Music(commands.Cog):
 
         # single track / search
         try:
-            source = await YTDLSource.from_query(
-                query,
-                loop=self.bot.loop,
-                requester=ctx.author,
-                stream=True,
-            )
+            data = await extract_info(query, guild_id=ctx.guild.id)
+        except ExtractorBusy:
+            await status_msg.edit(content=BUSY_MESSAGE)
+            return
         except Exception as e:
             print("[Music] Single track error:", e)
             await status_msg.edit(content=f"❌ Error: `{e}`")
             return
 
-        await player.add_to_queue(source, ctx.channel)
-        await status_msg.edit(content=f"✅ Added to queue: **{source.title}**")
+        track = Track.from_info(data, ctx.author)
+        await player.add_to_queue(track, ctx.channel)
+        await status_msg.edit(content=f"✅ Added to queue: **{track.title}**")
 
     @commands.command(name="skip")
     async def skip(self, ctx):
@@ -506,6 +960,31 @@ class Music(commands.Cog):
             vc.resume()
             await ctx.send("▶️ Resumed.")
 
+    @commands.command(name="musicstats", hidden=True)
+    async def musicstats(self, ctx):
+        """Show track transition latency for this server and extractor cache stats."""
+        player = self.get_player(ctx.guild)
+        lines = []
+
+        if player.gaps:
+            gaps_ms = [g * 1000 for g in player.gaps]
+            wakeups_ms = [w * 1000 for w in player.wakeups] or [0.0]
+            lines.append(
+                f"⏱️ **Gap between tracks** (last {len(gaps_ms)}): "
+                f"last `{gaps_ms[-1]:.0f} ms`, "
+                f"avg `{statistics.mean(gaps_ms):.0f} ms`, "
+                f"max `{max(gaps_ms):.0f} ms` "
+                f"(player wake-up avg `{statistics.mean(wakeups_ms):.1f} ms`, "
+                f"max `{max(wakeups_ms):.1f} ms`)"
+            )
+        else:
+            lines.append("⏱️ No track transitions recorded yet.")
+
+        lines.append(f"🗃️ **Extractor cache** (all servers): {extraction_cache.stats_line()}")
+        lines.append(f"⚙️ **Extractor queue** (all servers): {extraction_service.stats_line()}")
+        lines.append(f"💾 **Audio cache** (all servers): {audio_cache.stats_line()}")
+        await ctx.send("\n".join(lines))
+
     @commands.command(name="volume", aliases=["vol"])
     async def volume(self, ctx, volume: int = None):
         """
@@ -533,11 +1012,8 @@ class Music(commands.Cog):
             return
 
         player.volume = volume / 100
-
-        if vc.source and isinstance(vc.source, discord.PCMVolumeTransformer):
-            vc.source.volume = player.volume
-
         await ctx.send(f"✅ **Volume set to:** `{volume}%`")
+        await player.apply_volume()
 
 
 
@@ -3,7 +3,11 @@ import os
 import discord
 from discord.ext import commands
 
-DATA_PATH = "data/tickets.json"
+from utils.storage import get_storage
+
+NAMESPACE = "tickets"
+# imported into storage once, then no longer written
+LEGACY_DATA_PATH = "data/tickets.json"
 CONFIG_PATH = "config.json"
 
 
@@ -14,28 +18,25 @@ def load_json(path, default):
         return json.load(f)
 
 
-def save_json(path, data):
-    os.makedirs(os.path.dirname(path), exist_ok=True)
-    with open(path, "w", encoding="utf-8") as f:
-        json.dump(data, f, indent=2)
-
-
 class Ticketing(commands.Cog):
     def __init__(self, bot: commands.Bot):
         self.bot = bot
-        self.tickets = load_json(DATA_PATH, {})  # guild_id -> {user_id: channel_id}
+        self.storage = get_storage(bot)
+        # guild_id -> {user_id: channel_id}
+        self.tickets = self.storage.load(NAMESPACE, LEGACY_DATA_PATH)
         self.global_cfg = load_json(CONFIG_PATH, {})
 
     def get_guild_tickets(self, guild_id: int):
         return self.tickets.setdefault(str(guild_id), {})
 
-    def set_ticket(self, guild_id: int, user_id: int, channel_id: int | None):
+    async def set_ticket(self, guild_id: int, user_id: int, channel_id: int | None):
         gt = self.get_guild_tickets(guild_id)
         if channel_id is None:
             gt.pop(str(user_id), None)
+            await self.storage.delete(NAMESPACE, guild_id, user_id)
         else:
             gt[str(user_id)] = channel_id
-        save_json(DATA_PATH, self.tickets)
+            await self.storage.set(NAMESPACE, guild_id, user_id, channel_id)
 
     # ---- helpers ----
     def get_default_category_name(self):
@@ -103,7 +104,7 @@ class Ticketing(commands.Cog):
             name=channel_name, category=category, overwrites=overwrites
         )
 
-        self.set_ticket(guild.id, author.id, ticket_channel.id)
+        await self.set_ticket(guild.id, author.id, ticket_channel.id)
 
         await ticket_channel.send(
             f"Welcome {author.mention}! 🎫\n"
@@ -135,7 +136,7 @@ class Ticketing(commands.Cog):
             return await ctx.send("This doesn't seem to be a ticket channel.")
 
         # removing ticket channel
-        self.set_ticket(guild.id, owner_id, None)
+        await self.set_ticket(guild.id, owner_id, None)
 
         await ctx.send("Ticket closed. The channel will be deleted. 🔒", delete_after=3)
 
@@ -2,6 +2,9 @@ import json
 import os
 import discord
 from discord.ext import commands
+
+from utils.dispatch import dispatch
+
 with open ("config.json") as f:
     config = json.load(f)
 
@@ -142,12 +145,18 @@ PREFIX = CONFIG.get("prefix", "!")
 
 
 # =========== BOT SETUP ================
+class TsukiBot(commands.Bot):
+    async def process_commands(self, message):
+        # one parse for built-in and custom commands (utils/dispatch.py)
+        await dispatch(self, message)
+
+
 intents = discord.Intents.default()
 intents.message_content = True
 intents.members = True
 intents.guilds = True
 
-bot = commands.Bot(command_prefix=PREFIX, intents=intents, help_command=None)
+bot = TsukiBot(command_prefix=PREFIX, intents=intents, help_command=None)
 bot.help_command = CustomHelp()
 bot.help_command.cog = None  # to show from above
 
@@ -189,11 +198,13 @@ async def reload_cogs(ctx):
 
 
 # === before run ===
-for ext in initial_extensions:
-    try:
-        bot.load_extension(ext)  # no await
-        print(f"Loaded {ext}")
-    except Exception as e:
-        print(f"Failed to load {ext}: {e}")
-
-bot.run(config["token"])
\ No newline at end of file
+# guarded so yt-dlp worker processes (spawned, they re-import this file) don't start the bot
+if __name__ == "__main__":
+    for ext in initial_extensions:
+        try:
+            bot.load_extension(ext)  # no await
+            print(f"Loaded {ext}")
+        except Exception as e:
+            print(f"Failed to load {ext}: {e}")
+
+    bot.run(config["token"])
\ No newline at end of file
@@ -0,0 +1,153 @@
+import os
+import re
+from collections import OrderedDict
+
+# tracks get cached once they've been played this many times
+CACHE_AFTER_PLAYS = 2
+# how many track IDs we keep play counts for
+MAX_TRACKED_PLAYS = 10_000
+
+# only plain video IDs become file names
+_VIDEO_ID = re.compile(r"[\w-]{1,64}")
+
+
+def cacheable(video_id: str | None) -> bool:
+    return video_id is not None and _VIDEO_ID.fullmatch(video_id) is not None
+
+
+class AudioCache:
+    """
+    On-disk LRU cache of pre-encoded Opus (Ogg) files, one per video ID.
+
+    Files are named `<video id>.opus`. The LRU order survives restarts: it's
+    rebuilt from file mtimes, and every hit bumps the mtime. When the total
+    size goes over `max_bytes`, the least recently played files are deleted.
+    """
+
+    def __init__(
+        self,
+        directory: str,
+        max_bytes: int,
+        *,
+        min_plays: int = CACHE_AFTER_PLAYS,
+    ):
+        self.directory = directory
+        self.max_bytes = max_bytes
+        self.min_plays = min_plays
+        # video id -> file size, least recently used first
+        self.entries: OrderedDict[str, int] = OrderedDict()
+        self.total_bytes = 0
+        # video ids being downloaded right now
+        self.pending: set[str] = set()
+        self.plays: OrderedDict[str, int] = OrderedDict()
+
+        # metrics
+        self.hits = 0
+        self.misses = 0
+        self.evicted = 0
+
+        self.load()
+
+    def __len__(self) -> int:
+        return len(self.entries)
+
+    def __contains__(self, video_id: str) -> bool:
+        return video_id in self.entries
+
+    def path_for(self, video_id: str) -> str:
+        return os.path.join(self.directory, f"{video_id}.opus")
+
+    def load(self):
+        """Index the files already on disk, oldest first."""
+        os.makedirs(self.directory, exist_ok=True)
+        found = []
+        for entry in os.scandir(self.directory):
+            if entry.is_file() and entry.name.endswith(".opus"):
+                st = entry.stat()
+                found.append((st.st_mtime, entry.name[: -len(".opus")], st.st_size))
+        found.sort()
+
+        self.entries.clear()
+        self.total_bytes = 0
+        for _, video_id, size in found:
+            self.entries[video_id] = size
+            self.total_bytes += size
+        self.evict()
+
+    def get(self, video_id: str | None) -> str | None:
+        """Path of the cached file for a video, or None."""
+        if not cacheable(video_id) or video_id not in self.entries:
+            self.misses += 1
+            return None
+
+        path = self.path_for(video_id)
+        try:
+            os.utime(path)
+        except OSError:
+            # deleted behind our back
+            self.total_bytes -= self.entries.pop(video_id)
+            self.misses += 1
+            return None
+
+        self.entries.move_to_end(video_id)
+        self.hits += 1
+        return path
+
+    def record_play(self, video_id: str | None) -> bool:
+        """
+        Count a play of a track. Returns True if it's popular enough to be
+        cached and isn't cached (or being cached) yet.
+        """
+        if not cacheable(video_id) or video_id in self.entries or video_id in self.pending:
+            return False
+
+        plays = self.plays.pop(video_id, 0) + 1
+        self.plays[video_id] = plays
+        if len(self.plays) > MAX_TRACKED_PLAYS:
+            self.plays.popitem(last=False)
+        return plays >= self.min_plays
+
+    def add(self, video_id: str) -> str | None:
+        """Register a freshly downloaded file, evicting old ones if needed."""
+        self.pending.discard(video_id)
+        if not cacheable(video_id):
+            return None
+        path = self.path_for(video_id)
+        try:
+            size = os.path.getsize(path)
+        except OSError:
+            return None
+
+        if video_id in self.entries:
+            self.total_bytes -= self.entries.pop(video_id)
+        self.entries[video_id] = size
+        self.total_bytes += size
+        self.plays.pop(video_id, None)
+        self.evict()
+        return path if video_id in self.entries else None
+
+    def evict(self):
+        skipped = []
+        while self.total_bytes > self.max_bytes and self.entries:
+            video_id, size = self.entries.popitem(last=False)
+            try:
+                os.remove(self.path_for(video_id))
+            except FileNotFoundError:
+                pass
+            except OSError:
+                # still open (e.g. playing right now on Windows), try again later
+                skipped.append((video_id, size))
+                continue
+            self.total_bytes -= size
+            self.evicted += 1
+
+        for video_id, size in reversed(skipped):
+            self.entries[video_id] = size
+            self.entries.move_to_end(video_id, last=False)
+
+    def stats_line(self) -> str:
+        return (
+            f"{len(self.entries)} files, {self.total_bytes / 2**20:.0f}/"
+            f"{self.max_bytes / 2**20:.0f} MB, {self.hits} hits, "
+            f"{self.misses} misses, {self.evicted} evicted"
+        )
@@ -0,0 +1,39 @@
+class BanIndex:
+    """
+    Banned users of one guild, looked up by user ID or by lowercase name
+    ("name" or legacy "name#1234"). Built once from guild.bans() and then
+    kept up to date from ban / unban events.
+    """
+
+    def __init__(self):
+        # user_id -> display name ("name" or "name#1234")
+        self.by_id: dict[int, str] = {}
+        # lowercase name / name#discrim -> user_id
+        self.by_name: dict[str, int] = {}
+
+    def __len__(self) -> int:
+        return len(self.by_id)
+
+    @staticmethod
+    def _display(name: str, discriminator: str | None) -> str:
+        if discriminator and discriminator != "0":
+            return f"{name}#{discriminator}"
+        return name
+
+    def add(self, user_id: int, name: str, discriminator: str | None = None):
+        display = self._display(name, discriminator)
+        self.by_id[user_id] = display
+        self.by_name[name.lower()] = user_id
+        self.by_name[display.lower()] = user_id
+
+    def remove(self, user_id: int):
+        display = self.by_id.pop(user_id, None)
+        if display is None:
+            return
+        for key in (display.lower(), display.split("#", 1)[0].lower()):
+            if self.by_name.get(key) == user_id:
+                del self.by_name[key]
+
+    def find(self, name: str) -> int | None:
+        """User ID for a banned name (case-insensitive), or None."""
+        return self.by_name.get(name.strip().lower())
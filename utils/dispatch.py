@@ -0,0 +1,66 @@
+class CommandIndex:
+    """
+    Custom commands per guild, name -> entry, looked up by `dispatch` with
+    the name it already parsed. Reads never create entries; a guild only
+    shows up here once it has a command.
+    """
+
+    def __init__(self):
+        self.guilds: dict[int, dict[str, object]] = {}
+        # async handler(ctx, entry), set by the cog that owns the entries
+        self.handler = None
+
+    def get(self, guild_id: int, name: str):
+        cmds = self.guilds.get(guild_id)
+        if cmds is None:
+            return None
+        return cmds.get(name)
+
+    def add(self, guild_id: int, name: str, entry):
+        cmds = self.guilds.get(guild_id)
+        if cmds is None:
+            cmds = self.guilds[guild_id] = {}
+        cmds[name] = entry
+
+    def remove(self, guild_id: int, name: str) -> bool:
+        cmds = self.guilds.get(guild_id)
+        if not cmds or name not in cmds:
+            return False
+        del cmds[name]
+        if not cmds:
+            del self.guilds[guild_id]
+        return True
+
+    def clear(self):
+        self.guilds.clear()
+
+
+def get_command_index(bot) -> CommandIndex:
+    """The custom command index shared by the bot and the cog that fills it."""
+    index = getattr(bot, "command_index", None)
+    if index is None:
+        index = CommandIndex()
+        bot.command_index = index
+    return index
+
+
+async def dispatch(bot, message):
+    """
+    What Bot.process_commands does, with custom commands in the same pass:
+    the prefix and command name are parsed once by get_context, built-in
+    commands win, then the guild's custom commands are looked up by that
+    same name. Anything else goes to bot.invoke as usual (CommandNotFound).
+    """
+    if message.author.bot:
+        return
+
+    ctx = await bot.get_context(message)
+    if ctx.command is None and ctx.invoked_with and message.guild is not None:
+        index = get_command_index(bot)
+        if index.handler is not None:
+            entry = index.get(message.guild.id, ctx.invoked_with.lower())
+            if entry is not None:
+                await index.handler(ctx, entry)
+                return
+
+    await bot.invoke(ctx)
@@ -0,0 +1,177 @@
+import asyncio
+import statistics
+import time
+from collections import deque
+from concurrent.futures import Executor, ThreadPoolExecutor
+
+
+class ExtractorBusy(Exception):
+    """Raised right away when the extraction queue is full (never for priority jobs)."""
+
+
+class _Job:
+    __slots__ = ("guild_id", "args", "future", "queued_at")
+
+    def __init__(self, guild_id: int, args: tuple, future: asyncio.Future):
+        self.guild_id = guild_id
+        self.args = args
+        self.future = future
+        self.queued_at = time.perf_counter()
+
+
+class _RoundRobin:
+    """Jobs queued per guild, served one job per guild in turn."""
+
+    __slots__ = ("queues", "order")
+
+    def __init__(self):
+        self.queues: dict[int, deque[_Job]] = {}
+        # guilds with waiting jobs, in round-robin order
+        self.order: deque[int] = deque()
+
+    def __bool__(self) -> bool:
+        return bool(self.order)
+
+    def waiting(self, guild_id: int) -> int:
+        queue = self.queues.get(guild_id)
+        return len(queue) if queue else 0
+
+    def push(self, job: _Job):
+        queue = self.queues.get(job.guild_id)
+        if queue is None:
+            queue = self.queues[job.guild_id] = deque()
+            self.order.append(job.guild_id)
+        queue.append(job)
+
+    def pop(self) -> _Job:
+        guild_id = self.order.popleft()
+        queue = self.queues[guild_id]
+        job = queue.popleft()
+        if queue:
+            self.order.append(guild_id)
+        else:
+            del self.queues[guild_id]
+        return job
+
+
+class ExtractionService:
+    """
+    Runs blocking extraction calls (yt-dlp) on a dedicated executor, so they
+    never compete with the default thread pool.
+
+    Waiting jobs are queued per guild and served round-robin, so one guild
+    queueing a lot of songs can't starve the others. When the queue (or a
+    guild's share of it) is full, extract() raises ExtractorBusy immediately
+    instead of piling up more work.
+
+    Priority jobs (work the bot needs to keep playing, not new requests)
+    skip the caps and are served before everything else, round-robin per
+    guild as well.
+    """
+
+    def __init__(
+        self,
+        run,
+        *,
+        workers: int = 4,
+        max_queue: int = 50,
+        max_per_guild: int = 10,
+        executor: Executor | None = None,
+    ):
+        # blocking callable(*args) -> result, executed in the executor
+        self.run = run
+        self.workers = workers
+        self.max_queue = max_queue
+        self.max_per_guild = max_per_guild
+        self.executor = executor or ThreadPoolExecutor(
+            max_workers=workers, thread_name_prefix="ytdl"
+        )
+
+        self._normal = _RoundRobin()
+        self._priority = _RoundRobin()
+        self._queued = 0
+        self._available: asyncio.Semaphore | None = None
+        self._worker_tasks: list[asyncio.Task] = []
+
+        # metrics
+        self.served = 0
+        self.rejected = 0
+        self.wait_times: deque[float] = deque(maxlen=200)
+        self.run_times: deque[float] = deque(maxlen=200)
+
+    @property
+    def queued(self) -> int:
+        return self._queued
+
+    async def extract(self, guild_id: int, *args, priority: bool = False):
+        """Queue run(*args) for a guild and wait for its result."""
+        if not priority and (
+            self._queued >= self.max_queue
+            or self._normal.waiting(guild_id) >= self.max_per_guild
+        ):
+            self.rejected += 1
+            raise ExtractorBusy()
+
+        self._start_workers()
+
+        future = asyncio.get_running_loop().create_future()
+        job = _Job(guild_id, args, future)
+        (self._priority if priority else self._normal).push(job)
+        self._queued += 1
+        self._available.release()
+
+        return await future
+
+    def _start_workers(self):
+        if self._worker_tasks:
+            return
+        self._available = asyncio.Semaphore(0)
+        loop = asyncio.get_running_loop()
+        self._worker_tasks = [loop.create_task(self._worker()) for _ in range(self.workers)]
+
+    def _next_job(self) -> _Job:
+        self._queued -= 1
+        if self._priority:
+            return self._priority.pop()
+        return self._normal.pop()
+
+    async def _worker(self):
+        loop = asyncio.get_running_loop()
+        while True:
+            await self._available.acquire()
+            job = self._next_job()
+            if job.future.cancelled():
+                continue
+
+            started = time.perf_counter()
+            self.wait_times.append(started - job.queued_at)
+            try:
+                result = await loop.run_in_executor(self.executor, self.run, *job.args)
+            except Exception as e:
+                if not job.future.done():
+                    job.future.set_exception(e)
+            else:
+                if not job.future.done():
+                    job.future.set_result(result)
+            finally:
+                self.run_times.append(time.perf_counter() - started)
+                self.served += 1
+
+    def stats_line(self) -> str:
+        waits = sorted(w * 1000 for w in self.wait_times)
+        if waits:
+            wait = (
+                f"wait avg `{statistics.mean(waits):.0f} ms`, "
+                f"p95 `{waits[int(len(waits) * 0.95)]:.0f} ms`"
+            )
+        else:
+            wait = "no waits yet"
+        return (
+            f"{self._queued} queued, {self.served} served, {self.rejected} rejected (busy), {wait}"
+        )
+
+    def close(self):
+        for task in self._worker_tasks:
+            task.cancel()
+        self._worker_tasks = []
+        self.executor.shutdown(wait=False, cancel_futures=True)
@@ -0,0 +1,75 @@
+import heapq
+from bisect import bisect_left, bisect_right, insort
+
+
+class Leaderboard:
+    """
+    Scores per user, grouped into one bucket per distinct score, with the
+    distinct scores kept sorted. Invite counts move by ±1 and there are far
+    fewer distinct scores than users, so an update is a couple of set
+    operations (and rarely a bisect into the short score list), and the top
+    N is read from the highest buckets without sorting every user.
+    Users whose score drops to 0 are left out; ties are ordered by user ID.
+    """
+
+    def __init__(self, scores: dict[int, int] | None = None):
+        self.scores: dict[int, int] = {}
+        self._buckets: dict[int, set[int]] = {}
+        # distinct scores, ascending
+        self._order: list[int] = []
+        for user_id, score in (scores or {}).items():
+            self.set(user_id, score)
+
+    def __len__(self) -> int:
+        return len(self.scores)
+
+    def get(self, user_id: int) -> int:
+        return self.scores.get(user_id, 0)
+
+    def set(self, user_id: int, score: int):
+        old = self.scores.get(user_id, 0)
+        if old == score:
+            return
+
+        if old:
+            bucket = self._buckets[old]
+            bucket.discard(user_id)
+            if not bucket:
+                del self._buckets[old]
+                del self._order[bisect_left(self._order, old)]
+
+        if score:
+            self.scores[user_id] = score
+            bucket = self._buckets.get(score)
+            if bucket is None:
+                bucket = self._buckets[score] = set()
+                insort(self._order, score)
+            bucket.add(user_id)
+        else:
+            del self.scores[user_id]
+
+    def add(self, user_id: int, delta: int) -> int:
+        score = self.get(user_id) + delta
+        self.set(user_id, score)
+        return score
+
+    def top(self, n: int) -> list[tuple[int, int]]:
+        """[(user_id, score), ...] for the best n users."""
+        result = []
+        for score in reversed(self._order):
+            need = n - len(result)
+            if need <= 0:
+                break
+            bucket = self._buckets[score]
+            users = sorted(bucket) if len(bucket) <= need else heapq.nsmallest(need, bucket)
+            result.extend((user_id, score) for user_id in users)
+        return result
+
+    def rank(self, user_id: int) -> int | None:
+        """1-based position of a user, None if they have no score."""
+        score = self.scores.get(user_id)
+        if not score:
+            return None
+        above = sum(len(self._buckets[s]) for s in self._order[bisect_right(self._order, score):])
+        tied_before = sum(1 for other in self._buckets[score] if other < user_id)
+        return above + tied_before + 1
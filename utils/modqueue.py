@@ -0,0 +1,126 @@
+import asyncio
+import time
+
+# discord limits
+BULK_DELETE_MAX = 100
+MENTIONS_PER_MESSAGE = 50
+
+
+class ModerationQueue:
+    """
+    Collects moderation actions for a short window and sends them as few
+    REST calls as possible:
+    - message deletions are grouped per channel into bulk deletes (100 per call)
+    - warnings with the same text in the same channel become one message
+      that mentions every offender
+    - timeouts are deduplicated per member (and skipped while a previous one
+      is still recent) and applied with bounded concurrency
+
+    Only duck-typed channel/message/member objects are used, so a fake client
+    that records calls can stand in for discord.
+    """
+
+    def __init__(
+        self,
+        *,
+        window: float = 1.0,
+        workers: int = 2,
+        timeout_cooldown: float = 60.0,
+        ignore: tuple = (),
+    ):
+        self.window = window
+        self.timeout_cooldown = timeout_cooldown
+        # errors that are expected (missing perms, message already gone)
+        self.ignore = tuple(ignore)
+        self._sem = asyncio.Semaphore(workers)
+        # channel_id -> (channel, {message_id: message})
+        self._deletes: dict[int, tuple[object, dict]] = {}
+        # (channel_id, text) -> (channel, {mention: None}) (dict keeps order, no dupes)
+        self._warnings: dict[tuple[int, str], tuple[object, dict]] = {}
+        # member_id -> (member, until, reason)
+        self._timeouts: dict[int, tuple] = {}
+        # member_id -> monotonic time of the last timeout we sent
+        self._recent_timeouts: dict[int, float] = {}
+        self._flush_task: asyncio.Task | None = None
+
+    # ------ enqueue ------
+    def delete(self, message):
+        channel = message.channel
+        _, messages = self._deletes.setdefault(channel.id, (channel, {}))
+        messages[message.id] = message
+        self._schedule()
+
+    def warn(self, channel, mention: str, text: str):
+        _, mentions = self._warnings.setdefault((channel.id, text), (channel, {}))
+        mentions[mention] = None
+        self._schedule()
+
+    def timeout(self, member, until, reason: str):
+        last = self._recent_timeouts.get(member.id)
+        if last is not None and time.monotonic() - last < self.timeout_cooldown:
+            return
+        # first request in the window wins, one offence => one timeout
+        self._timeouts.setdefault(member.id, (member, until, reason))
+        self._schedule()
+
+    def _schedule(self):
+        if self._flush_task is None or self._flush_task.done():
+            self._flush_task = asyncio.get_running_loop().create_task(self._flush_later())
+
+    async def _flush_later(self):
+        # actions queued while a flush waits on REST calls don't schedule a
+        # new task (this one isn't done yet), so keep going until none are left
+        while True:
+            await asyncio.sleep(self.window)
+            await self.flush()
+            if not (self._deletes or self._warnings or self._timeouts):
+                return
+
+    # ------ flush ------
+    async def flush(self):
+        """Send everything queued so far."""
+        deletes, self._deletes = self._deletes, {}
+        warnings, self._warnings = self._warnings, {}
+        timeouts, self._timeouts = self._timeouts, {}
+
+        jobs = []
+        for channel, messages in deletes.values():
+            messages = list(messages.values())
+            for i in range(0, len(messages), BULK_DELETE_MAX):
+                jobs.append(self._delete_chunk(channel, messages[i : i + BULK_DELETE_MAX]))
+
+        for (_, text), (channel, mentions) in warnings.items():
+            mentions = list(mentions)
+            for i in range(0, len(mentions), MENTIONS_PER_MESSAGE):
+                content = f"{', '.join(mentions[i : i + MENTIONS_PER_MESSAGE])}, {text}"
+                jobs.append(self._call(channel.send, content, delete_after=8))
+
+        now = time.monotonic()
+        self._recent_timeouts = {
+            mid: t for mid, t in self._recent_timeouts.items() if now - t < self.timeout_cooldown
+        }
+        for member, until, reason in timeouts.values():
+            self._recent_timeouts[member.id] = now
+            jobs.append(self._call(member.edit, timed_out_until=until, reason=reason))
+
+        await asyncio.gather(*jobs)
+
+    async def _delete_chunk(self, channel, messages: list):
+        # bulk delete needs at least 2 messages
+        if len(messages) == 1:
+            await self._call(messages[0].delete)
+        else:
+            await self._call(channel.delete_messages, messages)
+
+    async def _call(self, fn, *args, **kwargs):
+        async with self._sem:
+            try:
+                await fn(*args, **kwargs)
+            except self.ignore:
+                pass
+            except Exception as e:
+                print("[ModQueue] Action failed:", e)
+
+    def close(self):
+        if self._flush_task and not self._flush_task.done():
+            self._flush_task.cancel()
@@ -0,0 +1,129 @@
+import asyncio
+import time
+from datetime import datetime, timedelta, timezone
+
+# discord only bulk-deletes messages younger than 14 days (minus a little slack)
+BULK_DELETE_MAX_AGE = timedelta(days=14) - timedelta(minutes=5)
+BULK_DELETE_MAX = 100
+# pause between single deletes of old messages (that endpoint has a tight bucket)
+SLOW_DELETE_DELAY = 1.0
+
+
+def bulk_cutoff() -> datetime:
+    """Messages created before this can't be bulk-deleted anymore."""
+    return datetime.now(timezone.utc) - BULK_DELETE_MAX_AGE
+
+
+class PurgeJob:
+    """
+    Deletes a channel's history while streaming through it.
+
+    Messages are read page by page; recent ones are bulk-deleted 100 at a time,
+    older ones are deleted one by one on a slow path. The 14-day cutoff is
+    re-checked for every chunk (a big purge outlives the slack), and a bulk
+    delete that is rejected anyway falls back to the slow path. Only counters
+    are kept, never the deleted messages. Cancel the task running run() to
+    stop early.
+    """
+
+    def __init__(
+        self,
+        channel,
+        *,
+        limit: int | None = None,
+        skip_ids: set[int] | None = None,
+        progress=None,
+        progress_every: float = 5.0,
+        ignore: tuple = (),
+        bulk_errors: tuple = (),
+    ):
+        self.channel = channel
+        self.limit = limit
+        self.skip_ids = skip_ids or set()
+        # async callback(job), called at most every progress_every seconds
+        self.progress = progress
+        self.progress_every = progress_every
+        # errors for messages that are already gone
+        self.ignore = tuple(ignore)
+        # errors from a rejected bulk delete, retried one message at a time
+        self.bulk_errors = tuple(bulk_errors)
+
+        self.scanned = 0
+        self.bulk_deleted = 0
+        self.slow_deleted = 0
+        self.started = time.monotonic()
+        self._last_progress = self.started
+
+    @property
+    def deleted(self) -> int:
+        return self.bulk_deleted + self.slow_deleted
+
+    @property
+    def elapsed(self) -> float:
+        return time.monotonic() - self.started
+
+    async def run(self) -> int:
+        """Run the purge and return how many messages were deleted."""
+        cutoff = bulk_cutoff()
+        chunk = []
+
+        async for message in self.channel.history(limit=self.limit):
+            self.scanned += 1
+            if message.id in self.skip_ids:
+                continue
+
+            if message.created_at >= cutoff:
+                chunk.append(message)
+                if len(chunk) == BULK_DELETE_MAX:
+                    await self._bulk_delete(chunk)
+                    chunk = []
+                    cutoff = bulk_cutoff()
+            else:
+                # history is newest first, so from here on everything is old
+                if chunk:
+                    await self._bulk_delete(chunk)
+                    chunk = []
+                await self._slow_delete(message)
+
+            await self._report()
+
+        if chunk:
+            await self._bulk_delete(chunk)
+        return self.deleted
+
+    async def _bulk_delete(self, messages: list):
+        # some of them may have aged past the limit while the purge was running
+        cutoff = bulk_cutoff()
+        fresh = [m for m in messages if m.created_at >= cutoff]
+        if len(fresh) > 1:
+            try:
+                await self.channel.delete_messages(fresh)
+            except self.bulk_errors as e:
+                print("[Purge] Bulk delete rejected, deleting one by one:", e)
+            else:
+                self.bulk_deleted += len(fresh)
+                messages = [m for m in messages if m.created_at < cutoff]
+
+        for message in messages:
+            await self._slow_delete(message, delay=message.created_at < cutoff)
+
+    async def _slow_delete(self, message, *, delay: bool = True):
+        try:
+            await message.delete()
+        except self.ignore:
+            return
+        self.slow_deleted += 1
+        if delay:
+            await asyncio.sleep(SLOW_DELETE_DELAY)
+
+    async def _report(self):
+        if self.progress is None:
+            return
+        now = time.monotonic()
+        if now - self._last_progress < self.progress_every:
+            return
+        self._last_progress = now
+        try:
+            await self.progress(self)
+        except Exception as e:
+            print("[Purge] Progress update failed:", e)
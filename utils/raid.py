@@ -0,0 +1,73 @@
+import time
+from collections import deque
+
+from utils.ratelimit import SlidingWindowLimiter
+
+# more than 10 joins in 10 seconds => raid mode
+RAID_JOINS = 10
+RAID_WINDOW = 10.0
+# raid mode ends this long after the join rate drops back under the limit
+RAID_COOLDOWN = 30.0
+
+
+class JoinVelocityTracker:
+    """
+    Tracks join rate per guild and flips a guild into raid mode on a burst.
+
+    Several cogs listen to on_member_join, so the same join can be reported
+    more than once; recent member IDs are remembered to count each join once.
+    """
+
+    def __init__(
+        self,
+        joins: int = RAID_JOINS,
+        window: float = RAID_WINDOW,
+        cooldown: float = RAID_COOLDOWN,
+    ):
+        self.cooldown = cooldown
+        self._limiter = SlidingWindowLimiter(joins, window)
+        self._recent: dict[int, deque[int]] = {}
+        # guild_id -> monotonic time raid mode ends
+        self._raid_until: dict[int, float] = {}
+
+    def record(self, guild_id: int, member_id: int, now: float | None = None) -> bool:
+        """Record a join. Returns True if the guild is in raid mode."""
+        if now is None:
+            now = time.monotonic()
+
+        recent = self._recent.setdefault(guild_id, deque(maxlen=64))
+        if member_id not in recent:
+            recent.append(member_id)
+            if self._limiter.hit(guild_id, now):
+                if not self.in_raid(guild_id, now):
+                    print(f"[Raid] Join burst detected in guild {guild_id}, raid mode on.")
+                self._raid_until[guild_id] = now + self.cooldown
+
+        return self.in_raid(guild_id, now)
+
+    def in_raid(self, guild_id: int, now: float | None = None) -> bool:
+        until = self._raid_until.get(guild_id)
+        if until is None:
+            return False
+        if now is None:
+            now = time.monotonic()
+        if now >= until:
+            del self._raid_until[guild_id]
+            return False
+        return True
+
+    def remaining(self, guild_id: int) -> float:
+        """Seconds left in raid mode (0 if not in raid mode)."""
+        until = self._raid_until.get(guild_id)
+        if until is None:
+            return 0.0
+        return max(0.0, until - time.monotonic())
+
+
+def get_join_tracker(bot) -> JoinVelocityTracker:
+    """The tracker shared by every cog that listens to joins."""
+    tracker = getattr(bot, "join_tracker", None)
+    if tracker is None:
+        tracker = JoinVelocityTracker()
+        bot.join_tracker = tracker
+    return tracker
@@ -0,0 +1,75 @@
+import asyncio
+import time
+from collections import OrderedDict, deque
+
+
+class SlidingWindowLimiter:
+    """
+    Counts hits per key (e.g. user ID) over a sliding window.
+
+    Each key keeps a deque of at most `limit + 1` monotonic timestamps, so an
+    update is amortized O(1). Keys are kept in least-recently-hit order and
+    dropped as soon as their newest hit falls out of the window, so memory
+    only grows with the number of keys active in the last `window` seconds.
+    """
+
+    def __init__(self, limit: int, window: float):
+        self.limit = limit
+        self.window = window
+        self._hits: OrderedDict[int, deque[float]] = OrderedDict()
+
+    def __len__(self) -> int:
+        return len(self._hits)
+
+    def hit(self, key: int, now: float | None = None) -> bool:
+        """Record a hit for key. Returns True if key is now over the limit."""
+        if now is None:
+            now = time.monotonic()
+        cutoff = now - self.window
+
+        times = self._hits.get(key)
+        if times is None:
+            times = deque(maxlen=self.limit + 1)
+            self._hits[key] = times
+        else:
+            self._hits.move_to_end(key)
+        times.append(now)
+
+        self._evict(cutoff)
+
+        # deque is capped at limit + 1, so it's only full when the oldest is still in window
+        return len(times) > self.limit and times[0] >= cutoff
+
+    def _evict(self, cutoff: float):
+        hits = self._hits
+        while hits:
+            key, times = next(iter(hits.items()))
+            if times[-1] >= cutoff:
+                break
+            del hits[key]
+
+    def reset(self, key: int):
+        self._hits.pop(key, None)
+
+
+class TokenBucket:
+    """
+    Async token bucket: `rate` tokens per second, bursts of up to
+    `capacity`. acquire() waits until a token is free.
+    """
+
+    def __init__(self, rate: float, capacity: float | None = None):
+        self.rate = rate
+        self.capacity = capacity or rate
+        self.tokens = self.capacity
+        self.updated = time.monotonic()
+
+    async def acquire(self):
+        while True:
+            now = time.monotonic()
+            self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+            self.updated = now
+            if self.tokens >= 1:
+                self.tokens -= 1
+                return
+            await asyncio.sleep((1 - self.tokens) / self.rate)
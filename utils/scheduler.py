@@ -0,0 +1,164 @@
+import asyncio
+import heapq
+import json
+import os
+import time
+
+
+class ReminderScheduler:
+    """
+    Every pending reminder lives in one heap ordered by due time, served by a
+    single task that only wakes up for the earliest one.
+
+    Reminders are persisted to an append-only journal (one JSON line per
+    "add" / "done"), replayed on startup and compacted once enough fired
+    entries pile up. A reminder is journaled "done" only once it was sent
+    (or failed for good), so one interrupted mid-send fires again after a
+    restart. Reminders that came due while the bot was offline fire right
+    after startup.
+    """
+
+    def __init__(self, path: str, fire):
+        self.path = path
+        # async callback(reminder: dict)
+        self.fire = fire
+        # (due, id, channel_id, user_id, text)
+        self._heap: list[tuple[float, int, int, int, str]] = []
+        # reminders being sent, by ID: out of the heap but not journaled "done" yet
+        self._firing: dict[int, tuple[float, int, int, int, str]] = {}
+        self._fire_tasks: set[asyncio.Task] = set()
+        self._next_id = 1
+        self._done_since_compact = 0
+        self._wakeup = asyncio.Event()
+        self._journal = None
+        self.load()
+
+    def __len__(self) -> int:
+        return len(self._heap)
+
+    # ------ persistence ------
+    def load(self):
+        pending: dict[int, tuple] = {}
+        if os.path.exists(self.path):
+            with open(self.path, "r", encoding="utf-8") as f:
+                for line in f:
+                    try:
+                        entry = json.loads(line)
+                    except json.JSONDecodeError:
+                        # half-written last line after a crash
+                        continue
+                    rid = entry["id"]
+                    self._next_id = max(self._next_id, rid + 1)
+                    if entry["op"] == "add":
+                        pending[rid] = (
+                            entry["due"],
+                            rid,
+                            entry["channel_id"],
+                            entry["user_id"],
+                            entry["text"],
+                        )
+                    else:
+                        pending.pop(rid, None)
+
+        self._heap = list(pending.values())
+        heapq.heapify(self._heap)
+        self.compact()
+
+    def compact(self):
+        """Rewrite the journal with only the pending reminders."""
+        if self._journal:
+            self._journal.close()
+        os.makedirs(os.path.dirname(self.path) or ".", exist_ok=True)
+        tmp_path = self.path + ".tmp"
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            for due, rid, channel_id, user_id, text in [*self._heap, *self._firing.values()]:
+                f.write(self._add_line(due, rid, channel_id, user_id, text))
+        os.replace(tmp_path, self.path)
+        self._journal = open(self.path, "a", encoding="utf-8")
+        self._done_since_compact = 0
+
+    @staticmethod
+    def _add_line(due, rid, channel_id, user_id, text) -> str:
+        entry = {
+            "op": "add",
+            "id": rid,
+            "due": due,
+            "channel_id": channel_id,
+            "user_id": user_id,
+            "text": text,
+        }
+        return json.dumps(entry) + "\n"
+
+    # ------ api ------
+    def add(self, due: float, channel_id: int, user_id: int, text: str) -> int:
+        """Schedule a reminder at unix time `due`. Returns its ID."""
+        rid = self._next_id
+        self._next_id += 1
+
+        self._journal.write(self._add_line(due, rid, channel_id, user_id, text))
+        self._journal.flush()
+
+        item = (due, rid, channel_id, user_id, text)
+        heapq.heappush(self._heap, item)
+        # only wake the runner if this is now the earliest reminder
+        if self._heap[0] is item:
+            self._wakeup.set()
+        return rid
+
+    async def run(self):
+        """Fire reminders as they come due. Runs until cancelled."""
+        while True:
+            self._wakeup.clear()
+            if not self._heap:
+                await self._wakeup.wait()
+                continue
+
+            delay = self._heap[0][0] - time.time()
+            if delay > 0:
+                try:
+                    await asyncio.wait_for(self._wakeup.wait(), timeout=delay)
+                except asyncio.TimeoutError:
+                    pass
+                continue
+
+            now = time.time()
+            while self._heap and self._heap[0][0] <= now:
+                item = heapq.heappop(self._heap)
+                self._firing[item[1]] = item
+                task = asyncio.create_task(self._fire(item))
+                self._fire_tasks.add(task)
+                task.add_done_callback(self._fire_tasks.discard)
+
+    async def _fire(self, item: tuple):
+        due, rid, channel_id, user_id, text = item
+        reminder = {
+            "id": rid,
+            "due": due,
+            "channel_id": channel_id,
+            "user_id": user_id,
+            "text": text,
+        }
+        try:
+            await self.fire(reminder)
+        except Exception as e:
+            # not retried: the channel or the permissions are gone
+            print("[Reminders] Failed to send reminder:", e)
+        self._done(rid)
+
+    def _done(self, rid: int):
+        self._firing.pop(rid, None)
+        if self._journal is None:
+            return
+        self._journal.write(json.dumps({"op": "done", "id": rid}) + "\n")
+        self._journal.flush()
+        self._done_since_compact += 1
+        if self._done_since_compact > max(1000, len(self._heap)):
+            self.compact()
+
+    def close(self):
+        # reminders still being sent stay pending in the journal
+        for task in self._fire_tasks:
+            task.cancel()
+        if self._journal:
+            self._journal.close()
+            self._journal = None
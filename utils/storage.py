@@ -0,0 +1,166 @@
+import asyncio
+import json
+import os
+import sqlite3
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+DB_PATH = "data/tsuki.db"
+
+
+class Storage:
+    """
+    Shared SQLite store (WAL mode) for cog data.
+
+    Data is kept as (namespace, guild_id, key) -> JSON value rows, the same
+    shape the old data/*.json files had, so each change is a single row
+    upsert/delete instead of a whole-file rewrite. Async writes run on one
+    dedicated thread, off the event loop.
+    """
+
+    def __init__(self, path: str = DB_PATH):
+        self.path = path
+        os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+        self._conn = sqlite3.connect(path, check_same_thread=False, isolation_level=None)
+        self._lock = threading.Lock()
+        self._executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="storage")
+
+        with self._lock:
+            self._conn.execute("PRAGMA journal_mode=WAL")
+            self._conn.execute("PRAGMA synchronous=NORMAL")
+            self._conn.execute(
+                "CREATE TABLE IF NOT EXISTS kv ("
+                " namespace TEXT NOT NULL,"
+                " guild_id TEXT NOT NULL,"
+                " key TEXT NOT NULL,"
+                " value TEXT NOT NULL,"
+                " PRIMARY KEY (namespace, guild_id, key)"
+                ") WITHOUT ROWID"
+            )
+            self._conn.execute(
+                "CREATE TABLE IF NOT EXISTS migrations (name TEXT PRIMARY KEY)"
+            )
+
+    # ------ sync (startup) ------
+    def load(self, namespace: str, legacy_path: str | None = None) -> dict:
+        """
+        Load a namespace as {guild_id: {key: value}}.
+        The first time, rows are imported from the legacy JSON file if there is one.
+        """
+        if legacy_path:
+            self.import_json(namespace, legacy_path)
+
+        data: dict[str, dict] = {}
+        with self._lock:
+            rows = self._conn.execute(
+                "SELECT guild_id, key, value FROM kv WHERE namespace = ?", (namespace,)
+            ).fetchall()
+        for guild_id, key, value in rows:
+            data.setdefault(guild_id, {})[key] = json.loads(value)
+        return data
+
+    def import_json(self, namespace: str, path: str):
+        """One-time migration of a {guild_id: {key: value}} JSON file."""
+
+        def read_rows() -> list[tuple]:
+            rows = []
+            if os.path.exists(path):
+                with open(path, "r", encoding="utf-8") as f:
+                    try:
+                        legacy = json.load(f)
+                    except json.JSONDecodeError:
+                        legacy = {}
+                for guild_id, items in legacy.items():
+                    if not isinstance(items, dict):
+                        continue
+                    for key, value in items.items():
+                        rows.append((str(guild_id), str(key), value))
+            return rows
+
+        count = self.import_rows(namespace, f"{namespace}:{path}", read_rows)
+        if count:
+            print(f"[Storage] Imported {count} row(s) from {path} into '{namespace}'.")
+
+    def import_rows(self, namespace: str, name: str, read_rows) -> int:
+        """
+        One-time migration named `name`: read_rows() -> [(guild_id, key, value)]
+        is only called (and its rows inserted) if it hasn't run before.
+        Returns how many rows were imported.
+        """
+        with self._lock:
+            done = self._conn.execute(
+                "SELECT 1 FROM migrations WHERE name = ?", (name,)
+            ).fetchone()
+            if done:
+                return 0
+
+            rows = [
+                (namespace, str(guild_id), str(key), json.dumps(value))
+                for guild_id, key, value in read_rows()
+            ]
+            with self._conn:
+                self._conn.execute("BEGIN")
+                self._conn.executemany(
+                    "INSERT OR IGNORE INTO kv (namespace, guild_id, key, value) VALUES (?, ?, ?, ?)",
+                    rows,
+                )
+                self._conn.execute("INSERT INTO migrations (name) VALUES (?)", (name,))
+        return len(rows)
+
+    # ------ async writes ------
+    async def _run(self, fn, *args):
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(self._executor, fn, *args)
+
+    def _write(self, upserts: list[tuple], deletes: list[tuple]):
+        with self._lock, self._conn:
+            self._conn.execute("BEGIN")
+            if upserts:
+                self._conn.executemany(
+                    "INSERT INTO kv (namespace, guild_id, key, value) VALUES (?, ?, ?, ?) "
+                    "ON CONFLICT (namespace, guild_id, key) DO UPDATE SET value = excluded.value",
+                    upserts,
+                )
+            if deletes:
+                self._conn.executemany(
+                    "DELETE FROM kv WHERE namespace = ? AND guild_id = ? AND key = ?",
+                    deletes,
+                )
+
+    async def set(self, namespace: str, guild_id: int | str, key: str, value):
+        await self._run(
+            self._write, [(namespace, str(guild_id), str(key), json.dumps(value))], []
+        )
+
+    async def set_many(self, namespace: str, guild_id: int | str, items: dict):
+        """Set several keys of a guild in one transaction."""
+        guild_id = str(guild_id)
+        upserts = [
+            (namespace, guild_id, str(key), json.dumps(value)) for key, value in items.items()
+        ]
+        if upserts:
+            await self._run(self._write, upserts, [])
+
+    async def delete(self, namespace: str, guild_id: int | str, key: str):
+        await self._run(self._write, [], [(namespace, str(guild_id), str(key))])
+
+    async def sync_guild(self, namespace: str, guild_id: int | str, old: dict, new: dict):
+        """Write only the keys that differ between two versions of a guild's data."""
+        guild_id = str(guild_id)
+        upserts = [
+            (namespace, guild_id, str(key), json.dumps(value))
+            for key, value in new.items()
+            if key not in old or old[key] != value
+        ]
+        deletes = [(namespace, guild_id, str(key)) for key in old if key not in new]
+        if upserts or deletes:
+            await self._run(self._write, upserts, deletes)
+
+
+def get_storage(bot) -> Storage:
+    """The storage shared by every cog."""
+    storage = getattr(bot, "storage", None)
+    if storage is None:
+        storage = Storage()
+        bot.storage = storage
+    return storage
@@ -0,0 +1,159 @@
+from random import random as _random
+
+# placeholders a response can use, filled in by the caller at render time
+FIELDS = frozenset({"user", "member", "server", "channel", "args", "count"})
+
+
+class _Field:
+    __slots__ = ("name",)
+
+    def __init__(self, name: str):
+        self.name = name
+
+    def render(self, values: dict[str, str]) -> str:
+        return values.get(self.name, "")
+
+
+class _Choice:
+    """`{a|b|c}`: one option picked at random every time it's rendered."""
+
+    __slots__ = ("options", "texts")
+
+    def __init__(self, options: list["Template"]):
+        self.options = options
+        # options without placeholders (the usual case) are picked as plain strings
+        self.texts = None
+        if all(option.static is not None for option in options):
+            self.texts = [option.static for option in options]
+
+    def render(self, values: dict[str, str]) -> str:
+        i = int(_random() * len(self.options))
+        if self.texts is not None:
+            return self.texts[i]
+        return self.options[i].render(values)
+
+
+class Template:
+    """
+    A response compiled once into literal strings and placeholder segments.
+    Rendering copies the literal parts, drops the placeholder values into
+    their slots and joins once, instead of a chain of str.replace calls.
+    """
+
+    __slots__ = ("source", "segments", "fields", "parts", "slots", "static")
+
+    def __init__(self, source: str, segments: list):
+        self.source = source
+        self.segments = segments
+        self.fields: set[str] = set()
+        # literals, with "" where a placeholder goes
+        self.parts: list[str] = []
+        # (index in parts, field name or _Choice)
+        self.slots: list[tuple[int, str | _Choice]] = []
+
+        for seg in segments:
+            if isinstance(seg, str):
+                self.parts.append(seg)
+                continue
+            if isinstance(seg, _Field):
+                self.fields.add(seg.name)
+                self.slots.append((len(self.parts), seg.name))
+            else:
+                for option in seg.options:
+                    self.fields |= option.fields
+                self.slots.append((len(self.parts), seg))
+            self.parts.append("")
+
+        # no placeholders at all: nothing to render
+        self.static: str | None = None
+        if not self.slots:
+            self.static = "".join(self.parts)
+
+    def render(self, values: dict[str, str]) -> str:
+        if self.static is not None:
+            return self.static
+        parts = self.parts.copy()
+        for i, slot in self.slots:
+            if slot.__class__ is str:
+                parts[i] = values.get(slot, "")
+            else:
+                parts[i] = slot.render(values)
+        return "".join(parts)
+
+
+def compile_template(text: str) -> Template:
+    """
+    Compile a response. `{user}`, `{member}`, `{server}`, `{channel}`,
+    `{args}` and `{count}` are placeholders, `{a|b|c}` picks one option at
+    random (options can contain placeholders). Any other braces are kept
+    as they are.
+    """
+    segments, _ = _parse(text, 0, nested=False)
+    return Template(text, segments)
+
+
+def _parse(text: str, pos: int, nested: bool) -> tuple[list, int]:
+    """Segments up to the end of the text (or of the current choice option)."""
+    segments = []
+    literal_start = pos
+    while pos < len(text):
+        c = text[pos]
+        if c == "{":
+            if pos > literal_start:
+                segments.append(text[literal_start:pos])
+            parsed, pos = _parse_braces(text, pos)
+            segments.extend(parsed)
+            literal_start = pos
+            continue
+        if nested and c in "|}":
+            break
+        pos += 1
+    if pos > literal_start:
+        segments.append(text[literal_start:pos])
+    return _merge_literals(segments), pos
+
+
+def _parse_braces(text: str, pos: int) -> tuple[list, int]:
+    """`text[pos]` is "{": a placeholder, a choice, or just literal braces."""
+    options = []
+    p = pos + 1
+    while True:
+        segments, p = _parse(text, p, nested=True)
+        options.append(segments)
+        if p >= len(text):
+            # never closed: keep it as text
+            return _literal_braces(options, closed=False), p
+        if text[p] == "|":
+            p += 1
+            continue
+        p += 1  # "}"
+        break
+
+    if len(options) > 1:
+        return [_Choice([Template("", segments) for segments in options])], p
+
+    segments = options[0]
+    if len(segments) == 1 and isinstance(segments[0], str) and segments[0] in FIELDS:
+        return [_Field(segments[0])], p
+    return _literal_braces(options, closed=True), p
+
+
+def _literal_braces(options: list[list], closed: bool) -> list:
+    segments = ["{"]
+    for i, option in enumerate(options):
+        if i:
+            segments.append("|")
+        segments.extend(option)
+    if closed:
+        segments.append("}")
+    return segments
+
+
+def _merge_literals(segments: list) -> list:
+    merged = []
+    for seg in segments:
+        if isinstance(seg, str) and merged and isinstance(merged[-1], str):
+            merged[-1] += seg
+        elif seg != "":
+            merged.append(seg)
+    return merged
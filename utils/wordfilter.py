@@ -0,0 +1,230 @@
+import re
+import unicodedata
+
+# ----------------- NORMALIZATION -----------------
+
+# characters people slip inside words to dodge the filter
+_INVISIBLE_RANGES = [
+    (0x00AD, 0x00AD),    # soft hyphen
+    (0x0300, 0x036F),    # combining marks ("zalgo")
+    (0x034F, 0x034F),    # combining grapheme joiner
+    (0x061C, 0x061C),    # arabic letter mark
+    (0x115F, 0x1160),    # hangul fillers
+    (0x17B4, 0x17B5),
+    (0x180E, 0x180E),    # mongolian vowel separator
+    (0x200B, 0x200F),    # zero-width space / joiners / direction marks
+    (0x202A, 0x202E),    # bidi embedding
+    (0x2060, 0x206F),    # word joiner, invisible operators
+    (0x3164, 0x3164),    # hangul filler
+    (0xFE00, 0xFE0F),    # variation selectors
+    (0xFEFF, 0xFEFF),    # BOM / zero-width no-break space
+    (0xE0000, 0xE007F),  # tag characters
+]
+
+# leetspeak / symbol substitutions
+_LEET = {
+    "0": "o",
+    "1": "i",
+    "3": "e",
+    "4": "a",
+    "5": "s",
+    "7": "t",
+    "8": "b",
+    "@": "a",
+    "$": "s",
+    "!": "i",
+    "|": "i",
+}
+
+# letters from other scripts that look like latin ones (lowercase, uppercase is added too)
+_HOMOGLYPHS = {
+    # cyrillic
+    "а": "a", "в": "b", "с": "c", "е": "e", "ё": "e", "һ": "h", "н": "h",
+    "і": "i", "ї": "i", "ј": "j", "к": "k", "м": "m", "о": "o", "р": "p",
+    "ԛ": "q", "ѕ": "s", "т": "t", "у": "y", "ү": "y", "х": "x", "ԝ": "w",
+    # greek
+    "α": "a", "β": "b", "ε": "e", "η": "n", "ι": "i", "κ": "k", "ν": "v",
+    "ο": "o", "ρ": "p", "τ": "t", "υ": "u", "χ": "x", "ω": "w",
+}
+
+# blocks whose compatibility decomposition gives a latin letter:
+# accented latin, enclosed letters (ⓐ), fullwidth (ａ), math alphanumerics (𝐚 𝒂 𝓪 ...)
+_DECOMPOSE_RANGES = [
+    (0x00C0, 0x024F),
+    (0x1E00, 0x1EFF),
+    (0x2460, 0x24FF),
+    (0xFF01, 0xFF5E),
+    (0x1D400, 0x1D7FF),
+]
+
+
+def _build_table() -> dict[int, str | None]:
+    table: dict[int, str | None] = {}
+
+    for lo, hi in _DECOMPOSE_RANGES:
+        for cp in range(lo, hi + 1):
+            decomposed = unicodedata.normalize("NFKD", chr(cp))
+            base = "".join(c for c in decomposed if not unicodedata.combining(c)).lower()
+            if base and base.isascii() and base != chr(cp):
+                table[cp] = _LEET.get(base, base)
+
+    for src, dst in _HOMOGLYPHS.items():
+        table[ord(src)] = dst
+        table[ord(src.upper())] = dst
+
+    for cp in range(ord("A"), ord("Z") + 1):
+        table[cp] = chr(cp).lower()
+
+    for src, dst in _LEET.items():
+        table[ord(src)] = dst
+
+    for lo, hi in _INVISIBLE_RANGES:
+        for cp in range(lo, hi + 1):
+            table[cp] = None
+
+    return table
+
+
+# built once at import, normalize() is then a single str.translate() call
+NORMALIZE_TABLE = _build_table()
+
+
+def normalize(text: str) -> str:
+    """
+    Fold text into the canonical form the filter matches against:
+    lowercase, confusables and leetspeak mapped to latin letters,
+    invisible characters removed. Repeated characters are handled by the matcher.
+    """
+    return text.translate(NORMALIZE_TABLE)
+
+
+# ----------------- COMPILATION -----------------
+
+def _tokenize(word: str) -> tuple:
+    """
+    Run-length encode a normalized word as (char, min_repeat) tokens.
+    A single letter matches one or more copies, a doubled letter two or more,
+    so "niiigger" still hits "nigger" but "niger" doesn't.
+    """
+    tokens = []
+    for ch in word:
+        if tokens and tokens[-1][0] == ch:
+            tokens[-1] = (ch, 2)
+        else:
+            tokens.append((ch, 1))
+    return tuple(tokens)
+
+
+def _build_trie(words) -> dict:
+    """Build a token trie, keeping only the shortest banned prefix of each branch."""
+    trie: dict = {}
+    # shorter words first, so longer words that contain them as a prefix are skipped
+    for tokens in sorted(words, key=len):
+        node = trie
+        for token in tokens:
+            if "" in node:
+                break
+            node = node.setdefault(token, {})
+        else:
+            node.clear()
+            node[""] = True
+    return trie
+
+
+def _trie_to_regex(node: dict, root: bool = True) -> str:
+    """
+    Turn a token trie into a regex where every branch shares its common prefix.
+    Runs after the first token use possessive quantifiers, so long repeated
+    input never backtracks. The first token is a plain literal: search() can
+    start at the last copy of a repeated letter anyway, and a `c*+` there
+    would be re-run from every start position (quadratic on "cccc...").
+    """
+    if "" in node:
+        return ""
+
+    alternatives = []
+    single_chars = []
+    for ch, repeat in sorted(node):
+        sub = _trie_to_regex(node[(ch, repeat)], root=False)
+        char = re.escape(ch)
+        if sub and root:
+            alternatives.append(char * repeat + sub)
+        elif sub:
+            # written as "cc*+" rather than "c++" so the leading literal stays visible to sre
+            alternatives.append(char * repeat + char + "*+" + sub)
+        elif repeat == 1:
+            # last letter of a word: one copy is enough to match
+            single_chars.append(char)
+        else:
+            alternatives.append(char * 2)
+
+    if single_chars:
+        if len(single_chars) == 1:
+            alternatives.append(single_chars[0])
+        else:
+            alternatives.append("[" + "".join(single_chars) + "]")
+
+    if len(alternatives) == 1:
+        return alternatives[0]
+    return "(?:" + "|".join(alternatives) + ")"
+
+
+class WordFilter:
+    """
+    In-memory banned word list compiled into a single regex.
+    The regex is built from a trie, so matching cost does not grow
+    linearly with the number of words. It is only rebuilt when the list changes.
+    Messages are run through normalize() before matching.
+    """
+
+    def __init__(self, words=()):
+        self._words: set[str] = set()
+        self._pattern: re.Pattern | None = None
+        for w in words:
+            w = str(w).lower().strip()
+            if w:
+                self._words.add(w)
+        self._compile()
+
+    def _compile(self):
+        tokens = {_tokenize(normalize(w)) for w in self._words}
+        tokens.discard(())
+        if not tokens:
+            self._pattern = None
+            return
+        self._pattern = re.compile(_trie_to_regex(_build_trie(tokens)))
+
+    @property
+    def words(self) -> list[str]:
+        return sorted(self._words)
+
+    def __contains__(self, word: str) -> bool:
+        return word in self._words
+
+    def __len__(self) -> int:
+        return len(self._words)
+
+    def add(self, word: str) -> bool:
+        """Add a word and recompile. Returns False if it was already there."""
+        word = word.lower().strip()
+        if not word or word in self._words:
+            return False
+        self._words.add(word)
+        self._compile()
+        return True
+
+    def remove(self, word: str) -> bool:
+        """Remove a word and recompile. Returns False if it wasn't there."""
+        word = word.lower().strip()
+        if word not in self._words:
+            return False
+        self._words.discard(word)
+        self._compile()
+        return True
+
+    def search(self, content: str) -> str | None:
+        """Return the first banned word found in content (normalized form), or None."""
+        if self._pattern is None:
+            return None
+        match = self._pattern.search(normalize(content))
+        return match.group(0) if match else None
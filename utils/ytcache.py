@@ -0,0 +1,193 @@
+import json
+import os
+import time
+from collections import OrderedDict
+from urllib.parse import parse_qs, urlparse
+
+# search query -> video ID mappings barely change
+QUERY_TTL = 24 * 3600
+# used when a stream URL has no expire= parameter
+DEFAULT_STREAM_TTL = 3600
+# drop stream URLs this long before they actually expire
+EXPIRY_SLACK = 300
+
+# the only fields of a yt-dlp result the music cog uses
+KEEP_FIELDS = ("id", "title", "webpage_url", "url", "duration", "acodec", "asr")
+
+
+class TTLCache:
+    """Small LRU cache where every entry also has its own expiry time (unix time)."""
+
+    def __init__(self, max_entries: int):
+        self.max_entries = max_entries
+        self._items: OrderedDict[str, tuple[float, object]] = OrderedDict()
+
+    def __len__(self) -> int:
+        return len(self._items)
+
+    def get(self, key: str, now: float | None = None):
+        item = self._items.get(key)
+        if item is None:
+            return None
+        expires, value = item
+        if (now or time.time()) >= expires:
+            del self._items[key]
+            return None
+        self._items.move_to_end(key)
+        return value
+
+    def set(self, key: str, value, expires: float):
+        self._items[key] = (expires, value)
+        self._items.move_to_end(key)
+        while len(self._items) > self.max_entries:
+            self._items.popitem(last=False)
+
+    def dump(self) -> list:
+        now = time.time()
+        return [[k, e, v] for k, (e, v) in self._items.items() if e > now]
+
+    def restore(self, items: list):
+        now = time.time()
+        for key, expires, value in items:
+            if expires > now:
+                self.set(key, value, expires)
+
+
+class ExtractionCache:
+    """
+    Cache in front of yt-dlp:
+    - query string -> [video ID, page URL], kept for a day
+    - video ID -> trimmed info incl. stream URL, kept until the URL's expire= time
+    Both are bounded LRUs. Hit/miss counters show how much extraction time is saved.
+    """
+
+    def __init__(self, max_queries: int = 5000, max_videos: int = 2000, path: str | None = None):
+        self.queries = TTLCache(max_queries)
+        self.videos = TTLCache(max_videos)
+        self.path = path
+
+        self.hits = 0
+        self.misses = 0
+        # misses where the query was known but the stream URL had expired (search skipped)
+        self.partial_hits = 0
+        self.extract_time = 0.0
+        self.extract_count = 0
+
+        if path:
+            self.load()
+
+    @staticmethod
+    def query_key(query: str) -> str:
+        query = query.strip()
+        if ExtractionCache.is_url(query):
+            return query
+        return query.lower()
+
+    @staticmethod
+    def is_url(query: str) -> bool:
+        return query.strip().startswith(("http://", "https://"))
+
+    def get(self, query: str) -> dict | None:
+        """Cached info for a query, or None."""
+        entry = self.queries.get(self.query_key(query))
+        if entry is None:
+            return None
+        # caches saved before the page URL was kept map to the bare video ID
+        video_id = entry if isinstance(entry, str) else entry[0]
+        info = self.videos.get(video_id)
+        if info is None:
+            return None
+        self.hits += 1
+        return dict(info)
+
+    def video_url_for(self, query: str) -> str | None:
+        """
+        Page URL of the result of a known search whose stream URL has expired,
+        so it can be extracted again without searching. None for URL queries,
+        they have no search to skip.
+        """
+        if self.is_url(query):
+            return None
+        entry = self.queries.get(self.query_key(query))
+        if not isinstance(entry, list) or not entry[1]:
+            return None
+        self.partial_hits += 1
+        return entry[1]
+
+    def put(self, query: str, data: dict, elapsed: float | None = None) -> dict:
+        """Store a fresh yt-dlp result. Returns the trimmed info that was cached."""
+        if elapsed is not None:
+            self.misses += 1
+            self.extract_time += elapsed
+            self.extract_count += 1
+
+        info = {k: data.get(k) for k in KEEP_FIELDS}
+        video_id = info.get("id")
+        if not video_id:
+            return info
+
+        now = time.time()
+        self.queries.set(
+            self.query_key(query), [video_id, info.get("webpage_url")], now + QUERY_TTL
+        )
+
+        expires = stream_url_expiry(info.get("url"))
+        if expires is None:
+            expires = now + DEFAULT_STREAM_TTL
+        expires -= EXPIRY_SLACK
+        if expires > now:
+            self.videos.set(video_id, info, expires)
+        return info
+
+    # ------ stats ------
+    @property
+    def avg_extract_time(self) -> float:
+        return self.extract_time / self.extract_count if self.extract_count else 0.0
+
+    @property
+    def saved_time(self) -> float:
+        """Rough extraction time saved: each full hit avoided an average extraction."""
+        return self.hits * self.avg_extract_time
+
+    def stats_line(self) -> str:
+        lookups = self.hits + self.misses
+        rate = self.hits / lookups * 100 if lookups else 0.0
+        return (
+            f"{self.hits} hits, {self.misses} misses ({self.partial_hits} skipped the search), "
+            f"{rate:.0f}% hit rate, ~{self.saved_time:.0f}s of extraction saved"
+        )
+
+    # ------ persistence ------
+    def load(self):
+        if not self.path or not os.path.exists(self.path):
+            return
+        try:
+            with open(self.path, "r", encoding="utf-8") as f:
+                data = json.load(f)
+        except (OSError, json.JSONDecodeError) as e:
+            print("[YTDL cache] Could not load cache:", e)
+            return
+        self.queries.restore(data.get("queries", []))
+        self.videos.restore(data.get("videos", []))
+
+    def save(self):
+        if not self.path:
+            return
+        os.makedirs(os.path.dirname(self.path) or ".", exist_ok=True)
+        tmp_path = self.path + ".tmp"
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            json.dump({"queries": self.queries.dump(), "videos": self.videos.dump()}, f)
+        os.replace(tmp_path, self.path)
+
+
+def stream_url_expiry(url: str | None) -> float | None:
+    """Unix time a signed stream URL stops working (YouTube's `expire=` param), if known."""
+    if not url:
+        return None
+    try:
+        expire = parse_qs(urlparse(url).query).get("expire")
+    except ValueError:
+        return None
+    if expire and expire[0].isdigit():
+        return float(expire[0])
+    return None
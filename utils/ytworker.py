@@ -0,0 +1,54 @@
+import multiprocessing
+import threading
+from concurrent.futures import Executor, ProcessPoolExecutor, ThreadPoolExecutor
+
+import yt_dlp as youtube_dl
+
+# YoutubeDL instances of the current worker (thread or process), by kind
+_worker = threading.local()
+
+
+def init_worker(options: dict[str, dict]):
+    """
+    Executor initializer: builds one YoutubeDL per kind (e.g. "single",
+    "playlist") up front, so the first job doesn't pay for it.
+    """
+    _worker.instances = {
+        kind: youtube_dl.YoutubeDL(opts) for kind, opts in options.items()
+    }
+
+
+def run_extract(kind: str, query: str, download: bool = False) -> dict | None:
+    """
+    Blocking yt-dlp call, runs inside a worker set up by init_worker().
+    Results are sanitized to plain dicts so they can be pickled back from
+    a worker process.
+    """
+    ydl = _worker.instances[kind]
+    info = ydl.extract_info(query, download=download)
+    if info is None:
+        return None
+    return ydl.sanitize_info(info)
+
+
+def make_executor(options: dict[str, dict], *, workers: int, processes: bool = False) -> Executor:
+    """
+    Thread pool (default) or process pool of warm yt-dlp workers.
+
+    Processes keep yt-dlp's CPU-heavy parsing off the bot's GIL. They are
+    started with "spawn" so they don't inherit the running event loop and
+    gateway threads; this needs main.py's `__main__` guard.
+    """
+    if processes:
+        return ProcessPoolExecutor(
+            max_workers=workers,
+            mp_context=multiprocessing.get_context("spawn"),
+            initializer=init_worker,
+            initargs=(options,),
+        )
+    return ThreadPoolExecutor(
+        max_workers=workers,
+        thread_name_prefix="ytdl",
+        initializer=init_worker,
+        initargs=(options,),
+    )